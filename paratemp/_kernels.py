@@ -0,0 +1,78 @@
+"""Scalar geometry kernels for single distance/angle/dihedral queries
+
+These work on plain 3-element sequences of floats with explicit scalar
+math. For a single query this is much faster than the equivalent chain of
+numpy calls, which is dominated by per-call dispatch overhead on arrays
+this small. For many queries at once, use the vectorized methods on
+:class:`paratemp.geometries.XYZ` instead.
+"""
+
+########################################################################
+#                                                                      #
+# Copyright 2018 Thomas J. Heavey IV                                   #
+#                                                                      #
+# Licensed under the Apache License, Version 2.0 (the "License");      #
+# you may not use this file except in compliance with the License.     #
+# You may obtain a copy of the License at                              #
+#                                                                      #
+#    http://www.apache.org/licenses/LICENSE-2.0                        #
+#                                                                      #
+# Unless required by applicable law or agreed to in writing, software  #
+# distributed under the License is distributed on an "AS IS" BASIS,    #
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or      #
+# implied.                                                             #
+# See the License for the specific language governing permissions and  #
+# limitations under the License.                                       #
+#                                                                      #
+########################################################################
+
+from __future__ import absolute_import
+
+import math
+
+
+def _distance(p0, p1):
+    """Return the distance between two points"""
+    dx, dy, dz = p0[0] - p1[0], p0[1] - p1[1], p0[2] - p1[2]
+    return math.sqrt(dx * dx + dy * dy + dz * dz)
+
+
+def _angle(p0, p1, p2):
+    """Return the angle (in radians) p0-p1-p2 with p1 as the vertex"""
+    ux, uy, uz = p0[0] - p1[0], p0[1] - p1[1], p0[2] - p1[2]
+    vx, vy, vz = p2[0] - p1[0], p2[1] - p1[1], p2[2] - p1[2]
+    cos = (ux * vx + uy * vy + uz * vz) / math.sqrt(
+        (ux * ux + uy * uy + uz * uz) * (vx * vx + vy * vy + vz * vz)
+    )
+    return math.acos(max(-1.0, min(1.0, cos)))
+
+
+def _dihedral(p0, p1, p2, p3):
+    """Return the dihedral angle (in radians) p0-p1-p2-p3
+
+    This is the same calculation as XYZ.dihedrals, written out in
+    components."""
+    b0x, b0y, b0z = p0[0] - p1[0], p0[1] - p1[1], p0[2] - p1[2]
+    b1x, b1y, b1z = p2[0] - p1[0], p2[1] - p1[1], p2[2] - p1[2]
+    b2x, b2y, b2z = p3[0] - p2[0], p3[1] - p2[1], p3[2] - p2[2]
+
+    # normalize b1 so that it does not influence magnitude of vector
+    # rejections that come next
+    b1_mag = math.sqrt(b1x * b1x + b1y * b1y + b1z * b1z)
+    b1x, b1y, b1z = b1x / b1_mag, b1y / b1_mag, b1z / b1_mag
+
+    # vector rejections of b0 and b2 onto plane perpendicular to b1
+    d0 = b0x * b1x + b0y * b1y + b0z * b1z
+    vx, vy, vz = b0x - d0 * b1x, b0y - d0 * b1y, b0z - d0 * b1z
+    d2 = b2x * b1x + b2y * b1y + b2z * b1z
+    wx, wy, wz = b2x - d2 * b1x, b2y - d2 * b1y, b2z - d2 * b1z
+
+    # angle between v and w in a plane is the torsion angle
+    x = vx * wx + vy * wy + vz * wz
+    # (b1 x v) . w
+    y = (
+        (b1y * vz - b1z * vy) * wx
+        + (b1z * vx - b1x * vz) * wy
+        + (b1x * vy - b1y * vx) * wz
+    )
+    return math.atan2(y, x)
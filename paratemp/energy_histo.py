@@ -24,28 +24,185 @@
 
 from __future__ import absolute_import
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import distutils.spawn
 import errno
 import glob
 import os
 import re
+import tempfile
 
 import MDAnalysis
-import gromacs.formats
 import gromacs.tools
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import subprocess
-from typing import List
+from typing import List, Optional
 
-from .tools import all_elements_same
+from .tools import all_elements_same, _stable_stat
 from . import __version__
 
 # TODO update docstrings to PEP specs
 # (one brief description line, blank line, longer description/guidelines)
 
 
+def _read_xvg_fast(path) -> np.ndarray:
+    """
+    Read the data from an xvg file into a transposed array
+
+    This skips the '#' and '@' header lines and lets numpy's C tokenizer
+    parse the numbers, which is much faster than gromacs.formats.XVG for
+    long files. Like XVG.array, the result has one row per column of the
+    file (i.e., the times are in row 0).
+
+    :param path: Name of the xvg file to read.
+    :return: The data from the file with the columns as rows.
+    :rtype: numpy.ndarray
+    """
+    return np.loadtxt(path, comments=("#", "@"), ndmin=2).T
+
+
+def _cached_xvg(path) -> np.ndarray:
+    """
+    Read an xvg file, using a memory-mapped .npy sidecar if it is current
+
+    The first time a file is read, the parsed (transposed) array is saved
+    next to it as path.npy along with a small path.npy.key file holding
+    the modification time and size of the xvg file. Later calls that find
+    a matching key load the saved array with mmap_mode='r' instead of
+    parsing the text again. Files modified within the last couple of
+    seconds are not cached, because a further change within the same
+    timestamp tick could leave the key unchanged. If the sidecar cannot be
+    written (e.g., the folder is read-only), the parsed array is just
+    returned.
+
+    :param path: Name of the xvg file to read.
+    :return: The data from the file with the columns as rows.
+    :rtype: numpy.ndarray
+    """
+    path = os.fspath(path)
+    key = _xvg_cache_key(path)
+    if key is not None:
+        cached = _load_xvg_cache(path, key)
+        if cached is not None:
+            return cached
+    data = np.ascontiguousarray(_read_xvg_fast(path))
+    if key is not None:
+        _save_xvg_cache(path, data, key)
+    return data
+
+
+def _xvg_cache_key(path: str) -> Optional[str]:
+    """Return the sidecar key for path, or None if it is too new to cache"""
+    stat = _stable_stat(path)
+    if stat is None:
+        return None
+    return "{} {}".format(stat.st_mtime_ns, stat.st_size)
+
+
+def _load_xvg_cache(path: str, key: str) -> Optional[np.ndarray]:
+    """Return the memory-mapped sidecar for path if its key matches"""
+    try:
+        with open(path + ".npy.key", "r") as key_file:
+            if key_file.read() == key:
+                return np.load(path + ".npy", mmap_mode="r")
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _save_xvg_cache(path: str, data: np.ndarray, key: str) -> None:
+    """
+    Save data as the .npy sidecar for the xvg path
+
+    Both files are written to temporary names and renamed into place, the
+    key last, so a concurrent reader never sees a partly written array
+    next to a matching key, and arrays already memory-mapped from an older
+    sidecar keep their contents.
+    """
+    try:
+        _replace_file(path + ".npy", lambda f: np.save(f, data, allow_pickle=False))
+        _replace_file(path + ".npy.key", lambda f: f.write(key.encode()))
+    except OSError:
+        pass
+
+
+def _replace_file(path: str, write) -> None:
+    """Call write on a temporary file, then atomically move it to path"""
+    folder, name = os.path.split(path)
+    with tempfile.NamedTemporaryFile(
+        dir=folder or ".", prefix="." + name, suffix=".tmp", delete=False
+    ) as f_out:
+        tmp_name = f_out.name
+        try:
+            write(f_out)
+        except BaseException:
+            f_out.close()
+            os.remove(tmp_name)
+            raise
+    try:
+        os.replace(tmp_name, path)
+    except OSError:
+        os.remove(tmp_name)
+        raise
+
+
+def _write_xvg(path: str, data: np.ndarray) -> None:
+    """
+    Write a transposed array as an NXY xvg file
+
+    Each row of data is written as a column of the file (so data[0]
+    should be the times).
+
+    :param path: Name of the xvg file to write.
+    :param data: Array with the columns of the file as rows.
+    :return: None
+    """
+    np.savetxt(
+        path,
+        data.T,
+        fmt="%s",
+        header="xmgrace compatible NXY data file\n"
+        "Written by paratemp.energy_histo",
+    )
+
+
+def _run_g_energy(file_name: str, output_name: str) -> str:
+    gromacs.tools.G_energy(f=file_name, o=output_name, input="Total-Energy")()
+    return output_name
+
+
+def _read_xvg_files(file_names) -> list:
+    """
+    Read xvg files with _cached_xvg, keeping the order
+
+    Files with a current sidecar are memory-mapped here, which is nearly
+    free. Only the files that need parsing are sent to a process pool (and
+    only when there is more than one of them), because pool results are
+    pickled back to this process and would otherwise lose the zero-copy
+    benefit of the cache.
+
+    :param file_names: Names of the xvg files to read.
+    :return: The data from each file with the columns as rows.
+    :rtype: List[numpy.ndarray]
+    """
+    file_names = [os.fspath(name) for name in file_names]
+    arrays = dict()
+    for name in file_names:
+        if name not in arrays:
+            key = _xvg_cache_key(name)
+            arrays[name] = None if key is None else _load_xvg_cache(name, key)
+    to_parse = [name for name, arr in arrays.items() if arr is None]
+    if len(to_parse) > 1:
+        n_workers = min(len(to_parse), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=n_workers) as ex:
+            arrays.update(zip(to_parse, ex.map(_cached_xvg, to_parse)))
+    else:
+        arrays.update((name, _cached_xvg(name)) for name in to_parse)
+    return [arrays[name] for name in file_names]
+
+
 def find_energies() -> List[str]:
     """
     Make energy{}.xvg files if they don't yet exist
@@ -55,31 +212,34 @@ def find_energies() -> List[str]:
     files, it checks if a file named energy(same number).xvg exists, and if
     not, creates it by calling the GROMACS tool gmx energy where input='13'
     corresponds to the total energy at each time.
+    The calls to gmx energy are independent, so they are run concurrently
+    in a thread pool; existing outputs are not remade.
     It returns a list of the names of the energy files."""
     energy_files = glob.glob("*[0-9].edr")
-    output_files = []
-    for file_name in energy_files:
-        output_name = (
-            "energy" + re.search(r"[0-9]*(?=\.edr)", file_name).group(0) + ".xvg"
-        )
-        if not os.path.isfile(output_name):
-            gromacs.tools.G_energy(f=file_name, o=output_name, input="Total-Energy")()
-        output_files += [output_name]
-    output_files.sort()
-    output_files.sort(key=len)
-    return output_files
+    output_files = [
+        "energy" + re.search(r"[0-9]*(?=\.edr)", file_name).group(0) + ".xvg"
+        for file_name in energy_files
+    ]
+    to_make = [
+        (file_name, output_name)
+        for file_name, output_name in zip(energy_files, output_files)
+        if not os.path.isfile(output_name)
+    ]
+    if to_make:
+        # gmx energy runs as a subprocess, so threads are enough to overlap
+        with ThreadPoolExecutor(max_workers=min(32, len(to_make))) as ex:
+            futures = [ex.submit(_run_g_energy, *args) for args in to_make]
+            for future in as_completed(futures):
+                future.result()
+    return sorted(output_files, key=lambda name: (len(name), name))
 
 
 def import_energies(output_files, return_lengths=False):
     """import_energies(file_list) takes a list of .xvg files in the current
     directory, imports their second columns (likely a list of energies at
-    consecutive time steps), and returns that as a list of arrays."""
-    imported_data = []
-    lengths = []
-    for file_name in output_files:
-        xvg_file = gromacs.formats.XVG(filename=file_name)
-        imported_data += [xvg_file.array[1]]
-        lengths += [len(xvg_file.array[1])]
+    consecutive time steps), and returns that as a list of arrays.
+    Files that are not already cached are parsed in parallel."""
+    imported_data = [arr[1] for arr in _read_xvg_files(output_files)]
     if return_lengths:
         lengths = [len(arr) for arr in imported_data]
         return imported_data, lengths
@@ -136,9 +296,16 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     out_files = find_energies()
-    all_data = import_energies(out_files)
+    # memory-mapped, so each file is only streamed through when used
+    all_data = [_cached_xvg(file_name)[1] for file_name in out_files]
 
-    plt.hist(all_data, 50, histtype="stepfilled")
+    e_min = min(data.min() for data in all_data)
+    e_max = max(data.max() for data in all_data)
+    edges = np.linspace(e_min, e_max, 51)
+    for data in all_data:
+        counts, _ = np.histogram(data, bins=edges)
+        # (plt.stairs would need matplotlib >= 3.4)
+        plt.hist(edges[:-1], edges, weights=counts, histtype="stepfilled")
 
     plt.show()
 
@@ -163,25 +330,37 @@ def combine_energy_files(basename="energy", files=False):
         files = glob.glob(basename + "*.xvg")
         files.sort()
         files.sort(key=len)
-    imported_data, lengths = import_energies(files, return_lengths=True)
-    if all_elements_same(lengths):
-        data = [gromacs.formats.XVG(filename=files[0]).array[0]]
-        data += imported_data
-    else:
-        len_shortest = min(lengths)
-        data = [gromacs.formats.XVG(filename=files[0]).array[0, :len_shortest]]
+    # one read per file; the times come from the first file's array
+    arrays = _read_xvg_files(files)
+    lengths = [arr.shape[1] for arr in arrays]
+    n_rows = min(lengths)
+    if not all_elements_same(lengths):
         print(
             "Energy lists not all equal lengths. "
             "Cropping all to the length of the shortest:"
-            " {}".format(len_shortest)
+            " {}".format(n_rows)
         )
-        imported_data = [part[:len_shortest] for part in imported_data]
-        data += imported_data
-    data = np.array(data)
-    gromacs.formats.XVG(array=data).write(filename=output_name)
+    data = np.empty((len(files) + 1, n_rows), dtype=np.float64)
+    data[0] = arrays[0][0, :n_rows]
+    for i, arr in enumerate(arrays, start=1):
+        data[i] = arr[1, :n_rows]
+    _write_xvg(output_name, data)
     return None
 
 
+def _walker_energies(energies: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """
+    Pick out the energy of each walker at each time
+
+    :param energies: Energies with a row per replica and column per time
+    :param indices: Replica index of each walker (rows) at each time. The
+        number of times sets how many columns of energies are used.
+    :return: Energies with a row per walker
+    """
+    idx = indices.astype(np.intp, copy=False)
+    return np.take_along_axis(energies[:, : idx.shape[1]], idx, axis=0)
+
+
 def deconvolve_energies(energyfile="energy_comb.xvg", indexfile="replica_temp.xvg"):
     """
     Take an xvg file and return an array of the energies of the walkers.
@@ -204,17 +383,17 @@ def deconvolve_energies(energyfile="energy_comb.xvg", indexfile="replica_temp.xv
     :return: An array with the energies of the walkers as separate rows
     :rtype: numpy.ndarray
     """
-    energies_indexed = gromacs.formats.XVG(filename=energyfile).array
-    indices_indexed = gromacs.formats.XVG(filename=indexfile).array.astype(int)
+    energies_indexed = _cached_xvg(energyfile)
+    indices_indexed = _cached_xvg(indexfile)
     # todo check for relative start/end points automatically
     length_e = energies_indexed.shape[1]
     length_i = indices_indexed.shape[1]
     ratio = float(length_e) / float(length_i)
     approx_ratio = int(round(ratio))
     if ratio == 1.0:
-        deconvolved_energies = energies_indexed[1:][
-            indices_indexed[1:], np.arange(length_i)
-        ]
+        deconvolved_energies = _walker_energies(
+            energies_indexed[1:], indices_indexed[1:]
+        )
         e_times = [energies_indexed[0, 0], energies_indexed[0, -1]]
         i_times = [indices_indexed[0, 0], indices_indexed[0, -1]]
     elif ratio > 1:
@@ -222,7 +401,7 @@ def deconvolve_energies(energyfile="energy_comb.xvg", indexfile="replica_temp.xv
             extra_e = 0
             extra_i = 0
         elif approx_ratio > ratio:
-            extra_i = length_i - length_e / approx_ratio
+            extra_i = length_i - length_e // approx_ratio
             extra_e = np.mod(length_e, length_i - extra_i)
         elif approx_ratio < ratio:
             extra_e = np.mod(length_e, length_i)
@@ -235,9 +414,10 @@ def deconvolve_energies(energyfile="energy_comb.xvg", indexfile="replica_temp.xv
         # just need to duplicate the index rows for consecutive energy
         # readings between attempted exchanges!
         # todo fix this to not waste energy values
-        deconvolved_energies = energies_indexed[
-            1:, : length_e - extra_e : approx_ratio
-        ][indices_indexed[1:, : length_i - extra_i], np.arange((length_i - extra_i))]
+        deconvolved_energies = _walker_energies(
+            energies_indexed[1:, : length_e - extra_e : approx_ratio],
+            indices_indexed[1:, : length_i - extra_i],
+        )
         e_times = [
             energies_indexed[0, : length_e - extra_e : approx_ratio][0],
             energies_indexed[0, : length_e - extra_e : approx_ratio][-1],
@@ -258,7 +438,7 @@ def deconvolve_energies(energyfile="energy_comb.xvg", indexfile="replica_temp.xv
             extra_i = 0
         # Not so sure about this...
         elif approx_ratio > ratio:
-            extra_e = length_e - length_i / approx_ratio
+            extra_e = length_e - length_i // approx_ratio
             extra_i = np.mod(length_i, length_e - extra_e)
         elif approx_ratio < ratio:
             extra_i = np.mod(length_i, length_e)
@@ -267,10 +447,10 @@ def deconvolve_energies(energyfile="energy_comb.xvg", indexfile="replica_temp.xv
             raise ImportError(
                 "ratio: " "{}, approx ratio: {}".format(ratio, approx_ratio)
             )
-        deconvolved_energies = energies_indexed[1:, : length_e - extra_e][
+        deconvolved_energies = _walker_energies(
+            energies_indexed[1:, : length_e - extra_e],
             indices_indexed[1:, : length_i - extra_i : approx_ratio],
-            np.arange((length_i - extra_i) / approx_ratio),
-        ]
+        )
         e_times = [
             energies_indexed[0, : length_e - extra_e][0],
             energies_indexed[0, : length_e - extra_e][-1],
@@ -537,7 +717,7 @@ def make_basic_plots(
     for ax in deconvolved_energies_hist_fig.axes:
         ax.get_xaxis().set_ticks([])
         ax.get_yaxis().set_ticks([])
-    combined_energies = gromacs.formats.XVG(filename="energy_comb.xvg").array
+    combined_energies = _cached_xvg("energy_comb.xvg")
     repl_ener_hist = hist_multi(
         combined_energies[1:].transpose(), index_offset=0, n_bins=100
     )
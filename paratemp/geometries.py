@@ -24,9 +24,14 @@
 
 from __future__ import absolute_import
 
+import functools
+import io
+import math
 import re
 import numpy as np
 from numpy.linalg import norm
+import pandas as pd
+from ._kernels import _angle, _dihedral, _distance
 from .exceptions import UnknownEnergyError, InputError
 
 # TODO add tests for these
@@ -35,6 +40,11 @@ from .exceptions import UnknownEnergyError, InputError
 __all__ = ["rotation_matrix", "Vector", "XYZ", "COM"]
 
 
+_RE_ENERGY = re.compile(r"Energy:\s+(-\d+\.\d+)")
+_RE_HAS_DIGIT = re.compile(r"[A-Za-z]+\d+")
+_RE_LEADING_ALPHA = re.compile(r"[A-Za-z]+")
+
+
 def rotation_matrix(axis, theta):
     """
     Return the rotation matrix associated with counterclockwise rotation about
@@ -58,29 +68,51 @@ def rotation_matrix(axis, theta):
     )
 
 
+@functools.lru_cache(maxsize=64)
+def _rotation_matrix_cached(axis_bytes, theta):
+    r_mat = rotation_matrix(np.frombuffer(axis_bytes, dtype=np.float64), theta)
+    r_mat.flags.writeable = False  # shared between callers
+    return r_mat
+
+
+def _cached_rotation_matrix(axis, theta):
+    """Memoized rotation_matrix for repeatedly requested rotations
+
+    The returned array is shared and read-only."""
+    axis_bytes = np.asarray(axis, dtype=np.float64).tobytes()
+    return _rotation_matrix_cached(axis_bytes, float(theta))
+
+
+def _mag(vec):
+    """Return the length of a 3-vector"""
+    return norm(vec)
+
+
+def _diff_angle(vec1, vec2):
+    """Return the angle (in radians) between two 3-vectors"""
+    return np.arccos(np.dot(vec1, vec2) / (norm(vec1) * norm(vec2)))
+
+
+def _rotate(vec, axis, angle):
+    """Return vec rotated counterclockwise about axis by angle radians"""
+    return np.dot(_cached_rotation_matrix(axis, angle), vec)
+
+
 class Vector(np.ndarray):
     def __new__(cls, *xyz):
-        if len(xyz) != 3:
-            try:
-                xyz = xyz[0]
-            except IndexError:
-                raise InputError(xyz, "3 values are required to make a vector")
-        if len(xyz) != 3:
+        arr = np.array(xyz[0] if len(xyz) == 1 else xyz, dtype=np.float64)
+        if arr.shape != (3,):
             raise InputError(xyz, "Length of vector must be 3.")
-        obj = super(Vector, cls).__new__(
-            cls, shape=(3,), buffer=np.array(xyz, dtype=float)
-        )
-        return obj
+        return arr.view(cls)
 
     def cross(self, vec):
         return np.cross(self, vec)
 
     def diff_angle(self, vec):
-        return np.arccos(self.dot(vec) / (norm(self) * norm(vec)))
+        return _diff_angle(self, vec)
 
     def rotate(self, axis, angle):
-        r_mat = rotation_matrix(axis, angle)
-        return np.dot(r_mat, self)
+        return _rotate(self, axis, angle)
 
     @property
     def x(self):
@@ -96,70 +128,102 @@ class Vector(np.ndarray):
 
     @property
     def mag(self):
-        return norm(self)
+        return _mag(self)
+
+
+def _read_atom_lines(f_obj):
+    """
+    Parse lines of 'atom x y z' into a list of atom names and an array
+
+    Any further columns on a line are ignored. A single blank last line is
+    ignored, but any other blank or incomplete line raises a ValueError.
+
+    :param f_obj: Open file (or buffer) positioned at the first atom line
+    :return: The atom names and the (n_atoms, 3) coordinates
+    :rtype: Tuple[List[str], numpy.ndarray]
+    """
+    df = pd.read_csv(
+        f_obj,
+        sep=r"\s+",
+        header=None,
+        names=["atom", "x", "y", "z"],
+        usecols=range(4),
+        dtype={"atom": str},
+        skip_blank_lines=False,
+        # no NA parsing: "NA" is sodium, and missing fields are left as ""
+        keep_default_na=False,
+        na_filter=False,
+        engine="c",
+    )
+    missing = df == ""
+    if len(df) and missing.iloc[-1].all():
+        df, missing = df.iloc[:-1], missing.iloc[:-1]  # Ignore blank last line
+    bad_lines = missing.any(axis=1)
+    if bad_lines.any():
+        bad_line = df[bad_lines].iloc[0].astype(str)
+        raise ValueError(
+            "invalid line in xyz file: {}".format(bad_line[bad_line != ""].tolist())
+        )
+    try:
+        coords = df[["x", "y", "z"]].to_numpy(dtype=np.float64)
+    except ValueError:
+        raise ValueError("invalid coordinates in xyz file")
+    return df["atom"].tolist(), coords
+
+
+_ATOM_LINE = "   %-10s % 10.5f % 10.5f % 10.5f\n"
+
+
+def _format_atom_lines(atoms, coords):
+    """Return the 'atom x y z' lines for a geometry as one string"""
+    return "".join(
+        [
+            _ATOM_LINE % (atom, x, y, z)
+            for atom, (x, y, z) in zip(atoms, np.asarray(coords).tolist())
+        ]
+    )
 
 
 class XYZ(object):
     def __init__(self, f_name):
         self.file = f_name
         with open(f_name, "r") as f_file:
-            f_lines = f_file.readlines()
-        if len(f_lines) < 2:
-            raise TypeError("The given file {} appears " "to be empty".format(f_name))
-        self._header = f_lines[0:2]
+            self._header = [f_file.readline(), f_file.readline()]
+            if not self._header[1]:
+                raise TypeError(
+                    "The given file {} appears " "to be empty".format(f_name)
+                )
+            self.atoms, self.coords = _read_atom_lines(f_file)
         if "Energy" in self._header[1]:
-            energy_match = re.search(r"(?:Energy:\s+)(-\d+\.\d+)", self._header[1])
+            energy_match = _RE_ENERGY.search(self._header[1])
             self._energy = float(energy_match.group(1))
         else:
             self._energy = None
         self._original_energy = self._energy
-        data = [line.split() for line in f_lines[2:]]
-        if not data[-1]:
-            data = data[:-1]  # Ignore blank last line
-        atom = None
-        try:
-            self.atoms = []
-            for atom in data:
-                self.atoms.append(atom[0])
-        except IndexError:
-            raise ValueError("invalid line in xyz file: {}".format(atom))
-        if re.search(r"([a-z]|[A-Z])+\d+", self.atoms[0]):
+        if self.atoms and _RE_HAS_DIGIT.search(self.atoms[0]):
             self._fix_atom_names()
-        try:
-            self.coords = list()
-            for atom in data:
-                self.coords.append(Vector([float(coord) for coord in atom[1:4]]))
-        except (IndexError, InputError):
-            raise ValueError("invalid line in xyz file: {}".format(atom))
 
     def _fix_atom_names(self):
-        atoms_new = []
-        for atom in self.atoms:
-            atoms_new.append(re.match(r"([a-z]|[A-Z])+", atom).group(0))
-        self.atoms = atoms_new
+        match = _RE_LEADING_ALPHA.match
+        self.atoms = [match(atom).group(0) for atom in self.atoms]
 
     def center_on(self, index):
-        center = self.coords[index]
-        self.coords = [coord - center for coord in self.coords]
+        self.coords -= self.coords[index].copy()
 
     def rotate_to_x_axis_on(self, index):
-        vec_x = Vector(1, 0, 0)
-        angle = self.coords[index].diff_angle(vec_x)
-        axis = self.coords[index].cross(vec_x)
-        self.coords = [coord.rotate(angle, axis) for coord in self.coords]
+        vec_x = np.array([1.0, 0.0, 0.0])
+        angle = _diff_angle(self.coords[index], vec_x)
+        axis = np.cross(self.coords[index], vec_x)
+        r_mat = rotation_matrix(axis, angle)
+        # (r_mat . coord) for every row, as one matrix product
+        self.coords = np.dot(self.coords, r_mat.T)
 
     def center_and_rotate_on(self, index1, index2):
         self.center_on(index1)
         self.rotate_to_x_axis_on(index2)
 
     def __str__(self):
-        f_string = "   {0: <10s} {1.x: > 10.5f} {1.y: > 10.5f} " "{1.z: > 10.5f}\n"
-        output_list = list(self._header)
-        output_list += [
-            f_string.format(self.atoms[i], self.coords[i])
-            for i in range(len(self.atoms))
-        ]
-        return "".join(output_list)
+        return "".join(self._header) + _format_atom_lines(self.atoms, self.coords)
 
     @property
     def n_atoms(self):
@@ -182,16 +246,14 @@ class XYZ(object):
 
     def replace_coords(self, arg):
         if isinstance(arg, str):
-            self.coords = XYZ(arg).coords.copy()
+            self.coords = XYZ(arg).coords
         else:
-            self.coords = arg.coords.copy()
+            self.coords = np.array(arg.coords, dtype=np.float64)
         self._energy = None  # Moved atoms, don't know energy
 
     def move_subset(self, movement, indices):
-        if not isinstance(movement, Vector):
-            movement = Vector(*movement)
-        for index in indices:
-            self.coords[index] = self.coords[index] + movement
+        # unbuffered, so an index given twice is moved twice (as in a loop)
+        np.add.at(self.coords, list(indices), np.asarray(movement, dtype=np.float64))
         self._energy = None  # Moved atoms, don't know energy
 
     def write(self, f_name):
@@ -201,10 +263,7 @@ class XYZ(object):
     def average_loc(self, *args):
         if len(args) == 1:  # if an Iterable is passed in
             args = args[0]
-        total_vec = Vector(0, 0, 0)
-        for i in args:
-            total_vec = total_vec + self.coords[i]
-        return total_vec / len(args)
+        return self.coords[list(args)].mean(axis=0)
 
     def distance_between(self, a, b):
         """
@@ -215,8 +274,7 @@ class XYZ(object):
         :rtype: float
         :return: Distance between the two atoms
         """
-        diff = self.coords[a] - self.coords[b]
-        return norm(diff)
+        return _distance(self.coords[a].tolist(), self.coords[b].tolist())
 
     def angle_between(self, a, b, c):
         """
@@ -228,9 +286,10 @@ class XYZ(object):
         :rtype: float
         :return: Angle between the atoms in degrees
         """
-        vec_a = self.coords[a] - self.coords[b]
-        vec_c = self.coords[c] - self.coords[b]
-        return np.degrees(vec_a.diff_angle(vec_c))
+        coords = self.coords
+        return math.degrees(
+            _angle(coords[a].tolist(), coords[b].tolist(), coords[c].tolist())
+        )
 
     def dihedral_between(self, a, b, c, d):
         """
@@ -243,12 +302,63 @@ class XYZ(object):
         :rtype: float
         :return: Dihedral between the atoms in degrees
         """
+        coords = self.coords
+        return math.degrees(
+            _dihedral(
+                coords[a].tolist(),
+                coords[b].tolist(),
+                coords[c].tolist(),
+                coords[d].tolist(),
+            )
+        )
+
+    def distances(self, a, b):
+        """
+        Calculate distances between many pairs of atoms by atom indices
+
+        :param Iterable[int] a: Indices of first atoms
+        :param Iterable[int] b: Indices of second atoms
+        :rtype: numpy.ndarray
+        :return: Distances between each pair of atoms
+        """
+        diff = self._rows(a) - self._rows(b)
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def angles(self, a, b, c):
+        """
+        Calculate angles between many sets of three atoms by atom indices
+
+        :param Iterable[int] a: Indices of first atoms
+        :param Iterable[int] b: Indices of second (vertex) atoms
+        :param Iterable[int] c: Indices of third atoms
+        :rtype: numpy.ndarray
+        :return: Angles between each set of atoms in degrees
+        """
+        p1 = self._rows(b)
+        vec_a = self._rows(a) - p1
+        vec_c = self._rows(c) - p1
+        cos = np.einsum("ij,ij->i", vec_a, vec_c) / (
+            norm(vec_a, axis=1) * norm(vec_c, axis=1)
+        )
+        return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+    def dihedrals(self, a, b, c, d):
+        """
+        Calculate dihedrals between many sets of four atoms by atom indices
+
+        :param Iterable[int] a: Indices of first atoms
+        :param Iterable[int] b: Indices of second atoms
+        :param Iterable[int] c: Indices of third atoms
+        :param Iterable[int] d: Indices of fourth atoms
+        :rtype: numpy.ndarray
+        :return: Dihedrals between each set of atoms in degrees
+        """
         # from https://stackoverflow.com/questions/20305272/dihedral-torsion-
         # angle-from-four-points-in-cartesian-coordinates-in-python
-        p0 = self.coords[a]
-        p1 = self.coords[b]
-        p2 = self.coords[c]
-        p3 = self.coords[d]
+        p0 = self._rows(a)
+        p1 = self._rows(b)
+        p2 = self._rows(c)
+        p3 = self._rows(d)
 
         b0 = -1.0 * (p1 - p0)
         b1 = p2 - p1
@@ -256,22 +366,25 @@ class XYZ(object):
 
         # normalize b1 so that it does not influence magnitude of vector
         # rejections that come next
-        b1 /= norm(b1)
+        b1 /= norm(b1, axis=1)[:, np.newaxis]
 
         # vector rejections
         # v = projection of b0 onto plane perpendicular to b1
         #   = b0 minus component that aligns with b1
         # w = projection of b2 onto plane perpendicular to b1
         #   = b2 minus component that aligns with b1
-        v = b0 - np.dot(b0, b1) * b1
-        w = b2 - np.dot(b2, b1) * b1
+        v = b0 - np.einsum("ij,ij->i", b0, b1)[:, np.newaxis] * b1
+        w = b2 - np.einsum("ij,ij->i", b2, b1)[:, np.newaxis] * b1
 
         # angle between v and w in a plane is the torsion angle
         # v and w may not be normalized but that's fine since tan is y/x
-        x = np.dot(v, w)
-        y = np.dot(np.cross(b1, v), w)
+        x = np.einsum("ij,ij->i", v, w)
+        y = np.einsum("ij,ij->i", np.cross(b1, v), w)
         return np.degrees(np.arctan2(y, x))
 
+    def _rows(self, indices):
+        return self.coords[np.asarray(indices, dtype=np.intp).reshape(-1)]
+
 
 class COM(XYZ):
     def __init__(self, f_name):
@@ -280,7 +393,7 @@ class COM(XYZ):
         self._title = []
         self._cm = []
         self.atoms = []
-        self.coords = []
+        self.coords = np.empty((0, 3))
         self._footer = []
         with open(f_name, "r") as f_file:
             f_lines = f_file.readlines()
@@ -288,7 +401,7 @@ class COM(XYZ):
 
     def _parser(self, lines):
         section = "header"
-        data = []
+        geom_lines = []
         for line in lines:
             if section == "header":
                 self._header.append(line)
@@ -308,23 +421,19 @@ class COM(XYZ):
                 if line.strip() == "":
                     section = "opt_input"
                     continue
-                data.append(line.split())
+                geom_lines.append(line)
                 continue
             elif section == "opt_input":
                 self._footer.append(line)
                 continue
-        self.atoms = [atom[0] for atom in data]
-        self.coords = [Vector([float(coord) for coord in atom[1:4]]) for atom in data]
+        if geom_lines:
+            self.atoms, self.coords = _read_atom_lines(io.StringIO("".join(geom_lines)))
 
     def __str__(self):
-        f_string = "   {0: <10s} {1.x: > 10.5f} {1.y: > 10.5f} " "{1.z: > 10.5f}\n"
-        output_list = list(self._header)
-        output_list += list(self._title)
-        output_list += list(self._cm)
-        output_list += [
-            f_string.format(self.atoms[i], self.coords[i])
-            for i in range(len(self.atoms))
-        ]
-        output_list += ["\n"]
-        output_list += list(self._footer)
-        return "".join(output_list)
+        return "".join(
+            self._header
+            + self._title
+            + self._cm
+            + [_format_atom_lines(self.atoms, self.coords), "\n"]
+            + self._footer
+        )
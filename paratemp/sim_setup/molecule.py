@@ -35,8 +35,6 @@ from typing import Union, Dict, Any
 import parmed
 import pkg_resources
 
-from ..tools import cd
-
 
 __all__ = ["Molecule", "make_mol_inputs"]
 
@@ -177,14 +175,17 @@ class Molecule(object):
         return self._name
 
     def _run_in_dir(self, cl, **kwargs) -> subprocess.CompletedProcess:
-        with cd(self._directory):
-            proc = subprocess.run(
-                cl,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                **kwargs
-            )
+        # cwd instead of cd so that this does not change the working
+        # directory of the whole process (Molecules can be parameterized
+        # in parallel threads)
+        proc = subprocess.run(
+            cl,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            cwd=str(self._directory),
+            **kwargs
+        )
         return proc
 
     def __repr__(self):
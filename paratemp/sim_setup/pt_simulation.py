@@ -22,6 +22,7 @@
 #                                                                      #
 ########################################################################
 
+import os
 import pathlib
 
 from . import para_temp_setup
@@ -79,7 +80,9 @@ class PTSimulation(Simulation):
                     grompp_exe="gmx_mpi grompp",
                 )
                 # TODO capture stdout/stderr in a consistent manner
-                output = open("gromacs_compile_output.log", "r").read()
+                output = pathlib.Path(os.getcwd(), "gromacs_compile_output.log")
+                if self.keep_output_in_memory:
+                    output = output.read_text()
                 self.outputs["compile_{}".format(step_name)] = output
             self.tprs[step_name] = tpr_base
             self._run_mdrun(step_name, tpr_base)
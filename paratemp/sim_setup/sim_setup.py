@@ -25,23 +25,29 @@ A set of functions for setuping up GROMACS simulations
 ########################################################################
 
 
+import concurrent.futures
 import errno
+import functools
 import glob
+import itertools
 import os
 import pathlib
 import py
 import re
+import shutil
 import subprocess
 from typing import Callable, Iterable, Match
 import warnings
 
 from paratemp.tools import _BlankStream
 from paratemp.exceptions import InputError
-from paratemp.tools import cd, copy_no_overwrite
+from paratemp.tools import copy_no_overwrite
+from paratemp.tools import _stable_stat
 
 
 __all__ = [
     "get_gro_files",
+    "iter_gro_files",
     "get_n_solvent",
     "get_solv_count_top",
     "set_solv_count_top",
@@ -51,38 +57,153 @@ __all__ = [
 ]
 
 
-def get_gro_files(trr_base="npt_PT_out", tpr_base="TOPO/npt", time=200000):
+_RE_MOL_SECTION = re.compile(r"\[\s*molecules\s*\]", re.IGNORECASE)
+_RE_MOL_SECTION_BYTES = re.compile(
+    rb"^[ \t]*\[[ \t]*molecules[ \t]*\]", re.IGNORECASE | re.MULTILINE
+)
+_RE_PLUMED_NUM = re.compile(r"([=,-])(\d+)")
+_RE_QSUB = re.compile(r'(\d+)\s\("(\w.*)"\)')
+_IO_BUFFER = 1 << 20
+_TAIL_CHUNK = 1 << 16
+
+
+@functools.lru_cache(maxsize=128)
+def _glob_in(abs_dir, pattern, mtime_ns):
+    return tuple(sorted(glob.glob(os.path.join(glob.escape(abs_dir), pattern))))
+
+
+def _cached_glob(folder, pattern):
+    """
+    Return the (sorted) paths in folder matching pattern, caching listings
+
+    The cache is keyed on the modification time of the folder, which changes
+    whenever an entry is added, removed, or renamed, so later changes (
+    including ones made by this module) are picked up without an explicit
+    invalidation. A folder modified within the last couple of seconds is
+    listed directly, because a second change within the same timestamp
+    tick would not change its mtime.
+
+    :param str folder: Folder to search in
+    :param str pattern: glob pattern for the names to match
+    :return: absolute paths of the matching files
+    :rtype: Tuple[str]
+    """
+    abs_dir = os.path.abspath(folder)
+    stat = _stable_stat(abs_dir)
+    if stat is None:
+        return _glob_in.__wrapped__(abs_dir, pattern, None)
+    return _glob_in(abs_dir, pattern, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=None)
+def _re_n_solv_bytes(res_name):
+    """Return the regex for the count line of the residue, for bytes"""
+    return re.compile(
+        rb"^[ \t]*" + re.escape(res_name.encode()) + rb"[ \t]+(\d+)",
+        re.IGNORECASE | re.MULTILINE,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _re_n_solv(res_name, flags=re.IGNORECASE):
+    """Return the compiled regex for the count line of the given residue"""
+    return re.compile(rf"(?:^\s*{re.escape(res_name)}\s+)(\d+)", flags)
+
+
+def get_gro_files(
+    trr_base="npt_PT_out", tpr_base="TOPO/npt", time=200000, max_workers=None
+):
     """
     Get a single frame from TRR as GRO file for several trajectories
 
+    The trjconv calls for the different trajectories are independent,
+    so they are run concurrently in a thread pool.
+
     :param str trr_base: Base name of the trr files (excluding any index and
         trr extension)
     :param str tpr_base: Base name of the tpr files (excluding any index and
         tpr extension)
     :param time:
+    :param int max_workers: Default: None. Maximum number of trjconv
+        processes to run at once. If None, this will be the smaller of the
+        number of trajectories and the number of CPUs.
     :return: List of the names of the generated .gro files
     """
-    from glob import glob
-
-    trr_files = glob(trr_base + "*.trr")
-    trr_files.sort()
-    trr_files.sort(key=len)
-    tpr_files = glob(tpr_base + "*.tpr")
-    tpr_files.sort()
-    tpr_files.sort(key=len)
+    tpr_files, trr_files = _trjconv_inputs(trr_base, tpr_base)
+    if not trr_files:
+        return list()
+    # trjconv runs as a subprocess, so threads are enough to overlap them
+    with _trjconv_pool(len(trr_files), max_workers) as ex:
+        out_files = list(
+            ex.map(_run_trjconv, tpr_files, trr_files, itertools.repeat(time))
+        )
+    return out_files
+
+
+def iter_gro_files(
+    trr_base="npt_PT_out", tpr_base="TOPO/npt", time=200000, max_workers=None
+):
+    """
+    Get a frame from several trajectories, yielding each GRO file when done
+
+    This is the same as :func:`get_gro_files`, except that the names of
+    the .gro files are yielded in the order the trjconv calls finish, so
+    the caller can start working on the first ones while the rest are
+    still being written. The file counts are checked when this is called,
+    not when iteration starts.
+
+    :param str trr_base: Base name of the trr files (excluding any index and
+        trr extension)
+    :param str tpr_base: Base name of the tpr files (excluding any index and
+        tpr extension)
+    :param time:
+    :param int max_workers: Default: None. Maximum number of trjconv
+        processes to run at once. See :func:`get_gro_files`.
+    :return: Iterator over the names of the generated .gro files
+    :rtype: Iterator[str]
+    """
+    tpr_files, trr_files = _trjconv_inputs(trr_base, tpr_base)
+    return _iter_trjconv(tpr_files, trr_files, time, max_workers)
+
+
+def _iter_trjconv(tpr_files, trr_files, time, max_workers):
+    if not trr_files:
+        return
+    with _trjconv_pool(len(trr_files), max_workers) as ex:
+        futures = [
+            ex.submit(_run_trjconv, tpr, trr, time)
+            for tpr, trr in zip(tpr_files, trr_files)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def _trjconv_inputs(trr_base, tpr_base):
+    """Return the matching tpr and trr files, sorted so they pair up"""
+    # shortest first, then lexicographic, so 'x10' sorts after 'x9'
+    trr_files = sorted(glob.glob(trr_base + "*.trr"), key=lambda s: (len(s), s))
+    tpr_files = sorted(glob.glob(tpr_base + "*.tpr"), key=lambda s: (len(s), s))
     if len(trr_files) != len(tpr_files):
         raise ValueError(
             "Number of trr and tpr files not equal: "
-            "{} != {}".format(len(trr_files), len(tpr_files))
+            f"{len(trr_files)} != {len(tpr_files)}"
         )
-    out_files = list()
+    return tpr_files, trr_files
+
+
+def _trjconv_pool(n_files, max_workers):
+    if max_workers is None:
+        max_workers = min(n_files, os.cpu_count() or 1)
+    return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+
+def _run_trjconv(tpr_file, trr_file, time):
+    """Dump the frame at time from trr_file to a gro file; return its name"""
     from gromacs.tools import Trjconv
 
-    for tpr_file, trr_file in zip(tpr_files, trr_files):
-        out_file = trr_file.replace("trr", "gro")
-        Trjconv(s=tpr_file, f=trr_file, o=out_file, dump=time, input="0")()
-        out_files.append(out_file)
-    return out_files
+    out_file = trr_file.replace("trr", "gro")
+    Trjconv(s=tpr_file, f=trr_file, o=out_file, dump=time, input="0")()
+    return out_file
 
 
 def get_n_solvent(folder, solvent="DCM"):
@@ -99,26 +220,24 @@ def get_n_solvent(folder, solvent="DCM"):
     :rtype: int
     """
     warnings.warn(
-        "This function is deprecated. Please use " "get_solv_count_top",
+        "This function is deprecated. Please use get_solv_count_top",
         DeprecationWarning,
     )
-    re_n_solv = re.compile(r"(?:^\s*{}\s+)(\d+)".format(solvent))
-    with cd(folder):
-        f_top = glob.glob("*.top")
-        if len(f_top) != 1:
-            raise ValueError(
-                "Found {} .top files in {}\nOnly can deal with "
-                "1".format(len(f_top), folder)
-            )
-        else:
-            f_top = f_top[0]
-        with open(f_top, "r") as file_top:
-            for line in file_top:
-                solv_match = re_n_solv.search(line)
-                if solv_match:
-                    return int(solv_match.group(1))
-            # Not the right error, but fine for now
-            raise ValueError("Didn't find n_solv in {}".format(folder))
+    re_n_solv = _re_n_solv(solvent, flags=0)
+    f_top = _cached_glob(folder, "*.top")
+    if len(f_top) != 1:
+        raise ValueError(
+            f"Found {len(f_top)} .top files in {folder}\nOnly can deal with 1"
+        )
+    else:
+        f_top = f_top[0]
+    with open(f_top, "r") as file_top:
+        for line in file_top:
+            solv_match = re_n_solv.search(line)
+            if solv_match:
+                return int(solv_match.group(1))
+        # Not the right error, but fine for now
+        raise ValueError(f"Didn't find n_solv in {folder}")
 
 
 def get_solv_count_top(n_top=None, folder=None, res_name="DCM"):
@@ -144,24 +263,26 @@ def get_solv_count_top(n_top=None, folder=None, res_name="DCM"):
         line with the solvent count. This could also be raised if it cannot find
         the molecules section.
     """
-    re_n_solv = re.compile(r"(?:^\s*{}\s+)(\d+)".format(res_name), flags=re.IGNORECASE)
+    re_n_solv = _re_n_solv(res_name)
+    res_name_lower = res_name.lower()
+    n_res = len(res_name)
     n_top = _get_n_top(n_top, folder)
     with open(n_top, "r") as in_top:
         mol_section = False
         for line in in_top:
-            if line.strip().startswith(";"):
+            stripped = line.lstrip()
+            # cheap prefix tests first so most lines skip the regexes
+            if stripped.startswith(";"):
                 pass
             elif not mol_section:
-                if re.search(r"\[\s*molecules\s*\]", line, flags=re.IGNORECASE):
+                if stripped.startswith("[") and _RE_MOL_SECTION.search(line):
                     mol_section = True
-            else:
+            elif stripped[:n_res].lower() == res_name_lower:
                 solv_match = re_n_solv.search(line)
                 if solv_match:
                     return int(solv_match.group(1))
         # Not the right error, but fine for now
-        raise RuntimeError(
-            "Did not find a line with the solvent count in " "{}".format(n_top)
-        )
+        raise RuntimeError(f"Did not find a line with the solvent count in {n_top}")
 
 
 def _get_n_top(n_top, folder):
@@ -177,16 +298,15 @@ def _get_n_top(n_top, folder):
     """
     if n_top is None:
         if folder is None:
-            raise InputError("None", "Either folder or n_top must be " "specified")
-        with cd(folder):
-            n_top = glob.glob("*.top")
-            if len(n_top) != 1:
-                raise ValueError(
-                    "Found {} .top files in {}\n".format(len(n_top), folder)
-                    + "Only can deal with 1"
-                )
-            else:
-                n_top = os.path.abspath(n_top[0])
+            raise InputError("None", "Either folder or n_top must be specified")
+        n_top = _cached_glob(folder, "*.top")
+        if len(n_top) != 1:
+            raise ValueError(
+                f"Found {len(n_top)} .top files in {folder}\n"
+                "Only can deal with 1"
+            )
+        else:
+            n_top = n_top[0]
     return n_top
 
 
@@ -210,8 +330,8 @@ def set_solv_count_top(
     :param int s_count: Default: 0. The count of solvent molecules to be set
         in the topology file.
     :param str res_name: Default: 'DCM'. Name of the residue to look for in
-        the topology file. This is case insensitive (this and the line will
-        be made lower case when searching for it).
+        the topology file. This is case insensitive (the re.IGNORECASE flag
+        is used).
     :param str prepend: Default: 'unequal-'. The string to prepend to the
         topology file name when copying it (to keep a copy of the original).
     :param bool verbose: Default: True. If True, messages will be printed if
@@ -222,58 +342,110 @@ def set_solv_count_top(
         line with the solvent count. This could also be raised if it cannot find
         the molecules section.
     """
-    n_top = _get_n_top(n_top, folder)
-    if s_count == get_solv_count_top(n_top=n_top, res_name=res_name):
-        if verbose:
-            print(
-                "Solvent count in {} already set at {}".format(
-                    os.path.relpath(n_top), str(s_count)
+    n_top = os.fspath(_get_n_top(n_top, folder))
+    tmp_name = n_top + ".tmp"
+    with open(n_top, "rb", buffering=_IO_BUFFER) as in_top:
+        # [ molecules ] is at the end of the file, so only the tail needs to
+        # be searched; everything else is copied as bytes
+        tail_start, tail = _read_molecules_tail(in_top)
+        solv_match = _re_n_solv_bytes(res_name).search(tail)
+        if solv_match is None:
+            # Not the right error, but fine for now
+            raise RuntimeError(
+                f"Did not find a line with the solvent count in {n_top}"
+            )
+        if int(solv_match.group(1)) == s_count:
+            if verbose:
+                print(
+                    f"Solvent count in {os.path.relpath(n_top)} already set at "
+                    f"{s_count}\nNot copying or changing file."
                 )
-                + "\nNot copying or changing file."
+            return None
+        try:
+            with open(tmp_name, "wb", buffering=_IO_BUFFER) as out_top:
+                in_top.seek(0)
+                _copy_bytes(in_top, out_top, tail_start + solv_match.start(1))
+                out_top.write(str(s_count).encode())
+                in_top.seek(tail_start + solv_match.end(1))
+                shutil.copyfileobj(in_top, out_top, _IO_BUFFER)
+            bak_name = os.path.join(
+                os.path.dirname(n_top), prepend + os.path.basename(n_top)
             )
-        return None
-    bak_name = os.path.join(os.path.dirname(n_top), prepend + os.path.basename(n_top))
-    copy_no_overwrite(n_top, bak_name)
-    with open(n_top, "r") as in_top:
-        lines = in_top.readlines()
-    with open(n_top, "w") as out_top:
-        mol_section = False
-        done = False
-        for line in lines:
-            if line.strip().startswith(";"):
-                pass
-            elif not mol_section:
-                if re.search(r"\[\s*molecules\s*\]", line, flags=re.IGNORECASE):
-                    mol_section = True
-            elif not done and res_name.lower() in line.lower():
-                line = re.sub(r"\d+", str(s_count), line)
-                done = True
-            out_top.write(line)
-    if not done:
-        # Not the right error, but fine for now
-        # Also, this should not be accessible: if anything, get_solv_count_top
-        # will fail with a RuntimeError first for any issue.
-        raise RuntimeError(
-            "Did not find a line with the solvent count" " in {}".format(n_top)
-        )
-    elif verbose:
+            try:
+                # keep the original inode as the backup instead of copying
+                # it; like copy_no_overwrite, this fails if the backup exists
+                os.link(n_top, bak_name)
+            except FileExistsError:
+                raise
+            except OSError:
+                # file system without hard links
+                copy_no_overwrite(n_top, bak_name)
+            shutil.copymode(n_top, tmp_name)
+            os.replace(tmp_name, n_top)
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+    if verbose:
         print(
-            "Solvent count in {} set at {}".format(os.path.relpath(n_top), str(s_count))
-            + "\nOriginal copied to {}.".format(os.path.relpath(bak_name))
+            f"Solvent count in {os.path.relpath(n_top)} set at {s_count}\n"
+            f"Original copied to {os.path.relpath(bak_name)}."
         )
     return None
 
 
-def copy_topology(f_from, f_to, overwrite=False):
-    try:
-        os.makedirs(f_to)
-    except OSError as e:
-        if e.errno == 17:
-            pass  # Ignore FileExistsError
+def _read_molecules_tail(f_top):
+    """
+    Find the molecules section of an open (binary) topology file
+
+    Chunks of increasing size are read back from the end of the file until
+    one contains the section header.
+
+    :param f_top: topology file opened in binary mode
+    :return: the byte offset of the section header and the bytes from there
+        to the end of the file. If there is no molecules section, the bytes
+        will be empty.
+    :rtype: Tuple[int, bytes]
+    """
+    size = f_top.seek(0, os.SEEK_END)
+    chunk = _TAIL_CHUNK
+    while True:
+        start = max(0, size - chunk)
+        f_top.seek(start)
+        tail = f_top.read()
+        if start == 0:
+            match = _RE_MOL_SECTION_BYTES.search(tail)
         else:
-            raise
-    to_copy = glob.glob(f_from + "/*.top")
-    to_copy += glob.glob(f_from + "/*.itp")
+            # the first line may be cut off, so skip it
+            first = tail.find(b"\n") + 1
+            match = first and _RE_MOL_SECTION_BYTES.search(tail, first)
+        if match:
+            return start + match.start(), tail[match.start() :]
+        if start == 0:
+            return start, b""
+        chunk *= 4
+
+
+def _copy_bytes(src, dst, n):
+    """Copy the next n bytes from file src to file dst"""
+    while n > 0:
+        data = src.read(min(n, _IO_BUFFER))
+        if not data:
+            break
+        dst.write(data)
+        n -= len(data)
+
+
+def copy_topology(f_from, f_to, overwrite=False):
+    os.makedirs(f_to, exist_ok=True)
+    with os.scandir(f_from) as entries:
+        # skip hidden files, as glob did
+        to_copy = [
+            entry.path
+            for entry in entries
+            if entry.name.endswith((".top", ".itp"))
+            and not entry.name.startswith(".")
+            and entry.is_file()
+        ]
     for path in to_copy:
         copy_no_overwrite(path, f_to, silent=overwrite)
 
@@ -289,15 +461,17 @@ def _submit_script(script_name, log_stream=_BlankStream()):
     :return: the job information as output by _job_info_from_qsub
     """
     cl = ["qsub", script_name]
-    proc = subprocess.Popen(
+    proc = subprocess.run(
         cl, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True
     )
-    output = proc.communicate()[0]
+    output = proc.stdout
     log_stream.write(output)
     log_stream.flush()
     if proc.returncode != 0:
         print(output)
-        raise subprocess.CalledProcessError(proc.returncode, " ".join(cl))
+        raise subprocess.CalledProcessError(
+            proc.returncode, " ".join(cl), output=output
+        )
     return _job_info_from_qsub(output)
 
 
@@ -310,10 +484,10 @@ def _job_info_from_qsub(output):
     given string
     :rtype: Tuple(str, str, str)
     """
-    match = re.search(r'(\d+)\s\("(\w.*)"\)', output)
+    match = _RE_QSUB.search(output)
     if not match:
         raise ValueError(
-            "Output from qsub was not able to be parsed: \n" "    {}".format(output)
+            f"Output from qsub was not able to be parsed: \n    {output}"
         )
     return match.group(1), match.group(2), match.group(0)
 
@@ -321,6 +495,31 @@ def _job_info_from_qsub(output):
 d_cgenff_ptad_repls = {1: 63, 9: 69, 8: 72, 120: 182}
 
 
+def _memoize_by_match(func):
+    """
+    Wrap a re.sub replacement function to cache results by matched text
+
+    The replacement is computed once per distinct matched string, and
+    repeated occurrences (PLUMED inputs reference the same atom indices
+    many times) are then a single dict lookup. This is only valid for
+    functions whose result depends only on the text of the match.
+
+    :param func: function that takes a re.Match object and returns a str
+    :return: function with the same call signature as func
+    """
+    memo = dict()
+
+    def wrapped(match):
+        key = match.group(0)
+        try:
+            return memo[key]
+        except KeyError:
+            out = memo[key] = func(match)
+            return out
+
+    return wrapped
+
+
 def _update_num(match, shift=120, cat_repl_dict=None):
     """
     Return a string with an updated number based on atom-index changes
@@ -350,7 +549,7 @@ def _update_num(match, shift=120, cat_repl_dict=None):
     try:
         n = int(s)
     except ValueError:
-        raise ValueError('"{}" cannot be converted to a valid int'.format(s))
+        raise ValueError(f'"{s}" cannot be converted to a valid int')
     if n < shift + 1:
         out = cat_repl_dict[n]
     else:
@@ -358,10 +557,27 @@ def _update_num(match, shift=120, cat_repl_dict=None):
     return pre + str(out)
 
 
+def _kw_regex(keys):
+    """
+    Compile a regex matching any of keys as a whitespace-separated word
+
+    The keyword itself is group 1. The lookahead leaves the following
+    whitespace unconsumed so that findall sees adjacent keywords.
+    """
+    keys = sorted(frozenset(keys), key=len, reverse=True)
+    if not keys:
+        return re.compile(r"(?!)")  # never matches
+    return re.compile(
+        r"(?:^|\s)(" + "|".join(re.escape(k) for k in keys) + r")(?=\s|$)"
+    )
+
+
 c_line_keywords = frozenset(
     {"WHOLEMOLECULES", "c1:", "c2:", "g1:", "g2:", "g3:", "g4:", "dm1:", "dm2:"}
 )
 d_line_keywords = frozenset({"tr5:", "tr6:", "FILE=COLVAR"})
+_RE_CHANGE_DEFAULT = _kw_regex(c_line_keywords)
+_RE_DELETE_DEFAULT = _kw_regex(d_line_keywords)
 d_equil_repls = {"dm2:": ["72", "71"], "dm1:": ["40", "12"]}
 
 
@@ -391,7 +607,8 @@ def update_plumed_input(
         three including the full match) groups. The first will be a
         pre-string that should be returned as-is, and the second will be a
         string of an int that should be changed based on how the atom indices
-        have changed.
+        have changed. Results are cached by the matched text, so this must
+        give the same output for the same input text.
     :type num_updater_kwargs: dict or None
     :param num_updater_kwargs: Default: None. If this is None (default),
         num_updater will be used as is.
@@ -409,29 +626,38 @@ def update_plumed_input(
     :return: None
     """
     if equil and equil_changes is None:
-        raise InputError("None", "equil_changes must be defined when equil is " "True")
+        raise InputError("None", "equil_changes must be defined when equil is True")
     if num_updater_kwargs is None:
         _num_updater = num_updater
     else:
+        _num_updater = functools.partial(num_updater, **num_updater_kwargs)
+    _num_updater = _memoize_by_match(_num_updater)
+    if change_keys is c_line_keywords:
+        re_change = _RE_CHANGE_DEFAULT
+    else:
+        re_change = _kw_regex(change_keys)
+    if delete_keys is d_line_keywords:
+        re_delete = _RE_DELETE_DEFAULT
+    else:
+        re_delete = _kw_regex(delete_keys)
 
-        def _num_updater(n):
-            num_updater(n, **num_updater_kwargs)
-
-    with open(n_plu_in, "r") as from_file, open(n_plu_out, "w") as to_file:
+    out_lines = []
+    with open(n_plu_in, "r", buffering=_IO_BUFFER) as from_file:
         for line in from_file:
-            c_key_match = set(line.split()) & set(change_keys)
-            if c_key_match:
-                line = re.sub(r"([=,-])(\d+)", _num_updater, line)
+            c_match = re_change.search(line)
+            if c_match:
                 if equil:
+                    key = c_match.group(1)
+                    # only the rest of the line needs checking for others
+                    c_key_match = {key, *re_change.findall(line, c_match.end(1))}
                     if len(c_key_match) > 1:
                         raise KeyError(
-                            "More than one keyword matched in "
-                            "line: {}".format(c_key_match)
+                            f"More than one keyword matched in line: {c_key_match}"
                         )
-                    key = c_key_match.pop()
-                    if key in equil_changes.keys():
-                        line = line.replace(*equil_changes[key])
-            elif set(line.split()) & set(delete_keys):
+                line = _RE_PLUMED_NUM.sub(_num_updater, line)
+                if equil and key in equil_changes.keys():
+                    line = line.replace(*equil_changes[key])
+            elif re_delete.search(line):
                 line = ""
             elif equil and line.startswith("UPPER_WALLS"):
                 # soften the upper walls
@@ -439,7 +665,9 @@ def update_plumed_input(
                 # pull them a little closer to make sure they're within the
                 # walls for the production simulation
                 line = line.replace("AT=12.0,12.0", "AT=10.5,10.5")
-            to_file.write(line)
+            out_lines.append(line)
+    with open(n_plu_out, "w", buffering=_IO_BUFFER) as to_file:
+        to_file.writelines(out_lines)
 
 
 def make_gromacs_sub_script(
@@ -512,63 +740,60 @@ def make_gromacs_sub_script(
     # should work even if it's already a Path (on Python 3.6+)
     path_file: pathlib.Path = pathlib.Path(filename)
     if path_file.exists() and not overwrite:
-        raise OSError(errno.EEXIST, "{} already exists".format(filename))
+        raise OSError(errno.EEXIST, f"{filename} already exists")
     # line separators will be added later
     lines = _get_sge_basic_lines(cores, log, name, time, tpn)
-    lines.append("\nexport MPI_COMPILER='pgi'\n")
-    lines.append("export NSIMS={}\n".format(nsims))
-    lines.append("export OMP_NUM_THREADS=$(($NSLOTS/$NSIMS))\n")
-    line = _get_mdrun_line(
-        checkpoint, deffnm, multi, nsims, other_mdrun, plumed, replex, tpr
-    )
-    lines.append(line)
-    lines.append("\n")
-    lines = [l + "\n" for l in lines]
-    with path_file.open("w") as f_out:
-        f_out.writelines(lines)
+    lines += [
+        "\nexport MPI_COMPILER='pgi'\n",
+        f"export NSIMS={nsims}\n",
+        "export OMP_NUM_THREADS=$(($NSLOTS/$NSIMS))\n",
+        _get_mdrun_line(
+            checkpoint, deffnm, multi, nsims, other_mdrun, plumed, replex, tpr
+        ),
+        "\n",
+    ]
+    path_file.write_text("\n".join(lines) + "\n")
     return path_file
 
 
 def _get_mdrun_line(checkpoint, deffnm, multi, nsims, other_mdrun, plumed, replex, tpr):
-    line = "mpirun -n $NSIMS --map-by node -x OMP_NUM_THREADS mdrun_mpi "
-    if tpr is not None:
-        line += "-s {} ".format(tpr)
-    if deffnm is not None:
-        line += "-deffnm {} ".format(deffnm)
-    if plumed is not None:
-        line += "-plumed {} ".format(plumed)
-    if multi is not None:
-        if multi is True:
-            line += "-multi {} ".format(nsims)
-        else:
-            line += "-multi {} ".format(multi)
-    if replex is not None:
-        line += "-replex {} ".format(replex)
-    if checkpoint is not None:
-        line += "-cpi {} ".format(checkpoint)
+    if multi is True:
+        multi = nsims
+    parts = ["mpirun -n $NSIMS --map-by node -x OMP_NUM_THREADS mdrun_mpi"]
+    for flag, value in (
+        ("-s", tpr),
+        ("-deffnm", deffnm),
+        ("-plumed", plumed),
+        ("-multi", multi),
+        ("-replex", replex),
+        ("-cpi", checkpoint),
+    ):
+        if value is not None:
+            parts += [flag, str(value)]
     if other_mdrun is not None:
-        line += other_mdrun
-    return line
+        parts.append(other_mdrun)
+    return " ".join(parts)
 
 
 def _get_sge_basic_lines(cores, log, name, time, tpn):
-    lines = list()  # line separators will be added later
-    lines.append("#!/bin/bash -l\n")  # want an extra line break here
-    if time is not None:
-        lines.append(_make_sge_line("l", "h_rt={}".format(time)))
-    if name is not None:
-        lines.append(_make_sge_line("N", name))
-    if log is not None:
-        lines.append(_make_sge_line("o", log))
+    """Return the shebang and SGE option lines (without line separators)"""
+    pe = None
     if tpn is not None and cores is not None:
         if int(cores) % int(tpn) != 0:
             raise ValueError("cores must be a multiple of tpn")
-        lines.append(
-            _make_sge_line("pe", "mpi_{}_tasks_per_node {}".format(tpn, cores))
-        )
-    return lines
+        pe = (tpn, cores)
+    options = (
+        ("#$ -l h_rt={}", time),
+        ("#$ -N {}", name),
+        ("#$ -o {}", log),
+        ("#$ -pe mpi_{0[0]}_tasks_per_node {0[1]}", pe),
+    )
+    # want an extra line break after the shebang
+    return ["#!/bin/bash -l\n"] + [
+        fmt.format(value) for fmt, value in options if value is not None
+    ]
 
 
 def _make_sge_line(key, arg):
     """Return a line of an option for SGE submission scripts"""
-    return "#$ -{} {}".format(key, arg)
+    return f"#$ -{key} {arg}"
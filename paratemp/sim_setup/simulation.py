@@ -22,13 +22,15 @@
 #                                                                      #
 ########################################################################
 
-from collections import OrderedDict
+import collections.abc
+import concurrent.futures
 import errno
+import functools
 import logging
+import os
 import pathlib
 import pickle
 import re
-import sys
 import typing
 
 import gromacs
@@ -36,7 +38,7 @@ import pkg_resources
 
 from .molecule import Molecule
 from .system import System
-from ..tools import cd
+from ..tools import cd, _stable_stat
 
 
 __all__ = ["Simulation", "SimpleSimulation"]
@@ -47,32 +49,48 @@ log = logging.getLogger(__name__)
 
 GenPath = typing.Union[pathlib.Path, str]
 
+_FOLDER_RE = re.compile(r"\d{2}-\w+-\w+")
 
-if sys.version_info >= (3, 6):
-
-    def resolve_path(path):
-        return pathlib.Path(path).resolve()
 
+def resolve_path(path: GenPath, resolve_symlinks: bool = False) -> pathlib.Path:
+    """
+    Return an absolute Path for the given path
 
-else:
+    By default, this only makes the path absolute (and normalizes it) with
+    :func:`os.path.abspath`, which does not touch the file system.
+    Resolving symlinks with :meth:`pathlib.Path.resolve` stats every
+    component of the path, so it is only done if asked for.
 
-    def resolve_path(path):
-        try:
-            return pathlib.Path(path).resolve()
-        except FileNotFoundError:
-            pass
-        path = pathlib.Path(path)
-        if path.is_absolute():
-            return path
-        return pathlib.Path.cwd().joinpath(path)
+    :param path: path to make absolute
+    :param resolve_symlinks: If True, symlinks will be resolved as well
+    :return: the absolute path
+    """
+    if resolve_symlinks:
+        return pathlib.Path(path).resolve()
+    return pathlib.Path(os.path.abspath(os.fspath(path)))
 
 
 class Simulation(object):
     """
     A class for setting up and running GROMACS simulations
-    """
 
-    _fp = staticmethod(resolve_path)
+    :param name: name of the simulation, used in the output file names
+    :param gro: path to the initial geometry
+    :param top: path to the topology file
+    :param base_folder: folder in which the folders for the steps are made
+    :param mdps: dict of step names to paths to mdp files. Each step can be
+        run with the method of the same name.
+    :param mdrun_args: extra arguments given to every mdrun call, e.g.,
+        ``dict(ntomp=4, pin='on', nb='gpu')`` (mdrun flags without the
+        leading dash, as gromacswrapper takes them). ``gmx_args`` given to a
+        step method are added to these for that step.
+    :param keep_output_in_memory: If False (default), the output of the
+        GROMACS programs for each step is written to log files in the step
+        folder, and :attr:`outputs` holds the paths to those files. If True,
+        :attr:`outputs` holds the output strings themselves.
+    :param lazy: If True, calling a step method only queues the step; the
+        queued steps are run in order by :meth:`run_until`.
+    """
 
     def __init__(
         self,
@@ -81,20 +99,63 @@ class Simulation(object):
         top: GenPath,
         base_folder: GenPath = ".",
         mdps: dict = None,
+        mdrun_args: dict = None,
+        keep_output_in_memory: bool = False,
+        lazy: bool = False,
     ):
+        self._path_cache = dict()  # type: typing.Dict[typing.Any, pathlib.Path]
+        # (mtime_ns, sorted (index, name) of the step folders in base_folder)
+        self._folder_listing = None  # type: typing.Tuple[int, tuple]
+        self._step_folders = set()  # type: typing.Set[pathlib.Path]
         self.name = name
         self.top = self._fp(top)
-        self.geometries = OrderedDict(initial=self._fp(gro))
+        self.geometries = dict(initial=self._fp(gro))
+        self._last_geom_key = "initial"
         self.base_folder = self._fp(base_folder)
         self.directories = dict(base=self.base_folder)
         self.mdps = dict() if mdps is None else mdps
+        self.mdrun_args = dict() if mdrun_args is None else mdrun_args
+        self.keep_output_in_memory = keep_output_in_memory
+        self.lazy = lazy
+        # steps queued in lazy mode, as (step name, step method kwargs)
+        self._graph = list()  # type: typing.List[typing.Tuple[str, dict]]
         self.tprs = dict()
         self.deffnms = dict()
         self.outputs = dict()
         for mdp in self.mdps:
-            setattr(self, mdp, self._make_step_method(mdp))
             self.mdps[mdp] = self._fp(mdps[mdp])
 
+    def __getattr__(self, name: str):
+        # Only called for missing attributes. The step methods are made the
+        # first time they are looked up, then stored on the instance.
+        # (__dict__ is used directly because mdps may not be set yet, e.g.,
+        # while unpickling)
+        if name in self.__dict__.get("mdps", ()):
+            func = self._make_step_method(name)
+            setattr(self, name, func)
+            return func
+        raise AttributeError(
+            f"{type(self).__name__!r} object has no attribute {name!r}"
+        )
+
+    def _fp(self, path: GenPath) -> pathlib.Path:
+        """
+        Return the absolute Path for path, caching the result
+
+        Relative paths are cached together with the current working
+        directory, because the steps run from inside their own folders.
+
+        :param path: path to make absolute
+        :return: the absolute path (see :func:`resolve_path`)
+        """
+        key = os.fspath(path)
+        if not os.path.isabs(key):
+            key = (os.getcwd(), key)
+        p_path = self._path_cache.get(key)
+        if p_path is None:
+            p_path = self._path_cache[key] = resolve_path(path)
+        return p_path
+
     @property
     def last_geometry(self) -> pathlib.Path:
         """
@@ -102,7 +163,7 @@ class Simulation(object):
 
         :return: The path to the last output geometry
         """
-        return next(reversed(self.geometries.items()))[1]
+        return self.geometries[self._last_geom_key]
 
     @property
     def _next_folder_index(self) -> int:
@@ -111,13 +172,41 @@ class Simulation(object):
 
         Note, this will not work if there are 99 or more folders.
         Folders should be of the form '01-minimize-benzene'
+
         :return: next folder index
         :rtype: int
         """
-        folders = [d.name for d in self.base_folder.iterdir() if d.is_dir()]
-        nums = [int(d[:2]) for d in folders if re.match(r"\d{2}-\w+-\w+", d)]
-        nums.sort()
-        return nums[-1] + 1 if nums else 1
+        return _next_index(self._list_step_folders())
+
+    def _list_step_folders(self) -> tuple:
+        """
+        List the step folders in :attr:`base_folder`, sorted by index
+
+        The listing is cached together with the modification time of
+        :attr:`base_folder`, so the folder is only listed again after
+        something in it has changed. Folders made by :meth:`_setup_for_step`
+        are added to the cached listing directly, so steps run one after
+        another do not list the folder again.
+
+        :return: (index, name) of each step folder
+        :rtype: Tuple[Tuple[int, str]]
+        """
+        stat = _stable_stat(self.base_folder)
+        cached = self._folder_listing
+        if stat is not None and cached is not None and cached[0] == stat.st_mtime_ns:
+            return cached[1]
+        # DirEntry.is_dir can usually answer without a stat call
+        with os.scandir(self.base_folder) as entries:
+            listing = tuple(
+                sorted(
+                    (int(entry.name[:2]), entry.name)
+                    for entry in entries
+                    if _FOLDER_RE.match(entry.name) and entry.is_dir()
+                )
+            )
+        if stat is not None:
+            self._folder_listing = (stat.st_mtime_ns, listing)
+        return listing
 
     def _make_step_method(self, step_name: str) -> typing.Callable:
         """
@@ -126,35 +215,144 @@ class Simulation(object):
         :param str step_name: Name of the step. This should be a valid key to
             `mdps` dict and will be the name of the method to which this
             function is mapped.
-        :return: A function to run the step specified by the mdp
+        :return: A function to run the step specified by the mdp (see
+            :meth:`_run_step` for its arguments). If :attr:`lazy` is True,
+            the function only queues the step and returns None.
         :rtype: typing.Callable
         """
 
-        def func(geometry=None, max_warn=0):
-            folder, geometry = self._setup_for_step(geometry, step_name)
-            with cd(folder):
-                tpr = self._compile_tpr(step_name, geometry, max_warn=max_warn)
-                self._run_mdrun(step_name, tpr)
-            return folder
+        def func(geometry=None, max_warn=0, run=True, gmx_args=None, force=False):
+            kwargs = dict(
+                geometry=geometry,
+                max_warn=max_warn,
+                run=run,
+                gmx_args=gmx_args,
+                force=force,
+            )
+            if self.lazy:
+                self._graph.append((step_name, kwargs))
+                return None
+            return self._run_step(step_name, **kwargs)
 
         return func
 
-    def _setup_for_step(self, geometry, step_name):
+    def _run_step(
+        self,
+        step_name: str,
+        geometry: GenPath = None,
+        max_warn: int = 0,
+        run: bool = True,
+        gmx_args: dict = None,
+        force: bool = False,
+    ) -> pathlib.Path:
+        """
+        Make the folder for a step, compile its tpr, and run it
+
+        Unless ``force`` is True, a folder for this step left by an earlier
+        run (e.g., one that crashed) is used again instead of making a new
+        one, and the tpr and mdrun outputs in it are only made again if they
+        are out of date (see :meth:`_compile_tpr` and :meth:`_run_mdrun`).
+
+        :param step_name: Key for the mdp file from the dict mdps
+        :param geometry: Path to the input geometry. If None,
+            :attr:`last_geometry` (at the time the step is run) will be used.
+        :param max_warn: Number of warnings allowed by grompp
+        :param run: If False, only the tpr will be compiled
+        :param gmx_args: extra arguments for mdrun (see :meth:`_run_mdrun`)
+        :param force: If True, always make a new folder and run everything
+        :return: The Path to the folder of the step
+        """
+        folder, geometry = self._setup_for_step(geometry, step_name, reuse=not force)
+        with cd(folder):
+            tpr = self._compile_tpr(
+                step_name, geometry, max_warn=max_warn, force=force
+            )
+            if run:
+                self._run_mdrun(step_name, tpr, gmx_args=gmx_args, force=force)
+        return folder
+
+    def run_until(self, step_name: str = None) -> typing.Optional[pathlib.Path]:
+        """
+        Run the steps queued in lazy mode, in order
+
+        Each step is removed from the queue once it has finished, so if one
+        raises an exception, this can be called again to retry from there.
+
+        :param step_name: Run the queued steps up to and including the
+            first one with this name. If None, all queued steps are run.
+        :return: The Path to the folder of the last step run, or None if
+            there were no steps to run
+        :raises KeyError: If no step with that name is queued
+        """
+        names = [name for name, _ in self._graph]
+        if step_name is None:
+            n_steps = len(names)
+        elif step_name in names:
+            n_steps = names.index(step_name) + 1
+        else:
+            raise KeyError(f"{step_name} is not a queued step")
+        folder = None
+        for _ in range(n_steps):
+            name, kwargs = self._graph[0]
+            folder = self._run_step(name, **kwargs)
+            del self._graph[0]
+        return folder
+
+    def _setup_for_step(self, geometry, step_name, reuse=False):
         geometry = self.last_geometry if geometry is None else geometry
-        folder_index = self._next_folder_index
-        folder = self.base_folder / "{:0>2}-{}-{}".format(
-            folder_index, step_name, self.name
-        )
-        folder.mkdir()
+        # one listing answers both which folder to reuse and the next index
+        listing = self._list_step_folders()
+        folder = self._existing_step_folder(step_name, listing) if reuse else None
+        if folder is None:
+            folder_index = _next_index(listing)
+            folder = self.base_folder / f"{folder_index:0>2}-{step_name}-{self.name}"
+            folder.mkdir()
+            # add our own folder to the cached listing, so base_folder is
+            # only listed again if something else changes it
+            self._folder_listing = (
+                os.stat(self.base_folder).st_mtime_ns,
+                listing + ((folder_index, folder.name),),
+            )
+        else:
+            log.info(f"Using existing folder {folder} for step {step_name}")
         self.directories[step_name] = folder
+        self._step_folders.add(folder)
         return folder, geometry
 
+    def _existing_step_folder(
+        self, step_name: str, listing: tuple = None
+    ) -> typing.Optional[pathlib.Path]:
+        """
+        Find the first folder for this step not yet used by this Simulation
+
+        Step methods reuse existing folders by default (unless called with
+        ``force=True``), so that a pipeline run again after a crash picks up
+        where it stopped. Folders are matched in order of their index, and
+        folders already used in this session are skipped, so when a step is
+        repeated in a pipeline each call gets the folder made by the same
+        call last time, and running a step again still makes a new folder.
+
+        :param step_name: name of the step
+        :param listing: the result of :meth:`_list_step_folders`, if it has
+            already been found
+        :return: Path to the folder, or None if there is none
+        """
+        listing = self._list_step_folders() if listing is None else listing
+        re_folder = _step_folder_re(step_name, self.name)
+        for _, name in listing:
+            if re_folder.match(name):
+                folder = self.base_folder / name
+                if folder not in self._step_folders:
+                    return folder
+        return None
+
     def _compile_tpr(
         self,
         step_name: str,
         geometry: GenPath = None,
         trajectory: GenPath = None,
         max_warn: int = 0,
+        force: bool = False,
     ) -> pathlib.Path:
         """
         Make a tpr file for the chosen step_name and associated mdp file
@@ -171,12 +369,22 @@ class Simulation(object):
             be warning about things you agree with and understand (e.g.,
             removing angular motions for a cluster of molecules when using
             PBCs).
+        :param force: If False, grompp is skipped when the tpr file already
+            exists and is newer than all of its inputs.
         :return: The Path to the tpr file
         """
         geometry = self.last_geometry if geometry is None else geometry
-        tpr = "{}-{}.tpr".format(self.name, step_name)
-        p_tpr = self._fp(tpr)
+        tpr = f"{self.name}-{step_name}.tpr"
+        # this runs from inside the step folder, so the name is only ever
+        # resolved once and there is nothing to gain from caching it
+        p_tpr = pathlib.Path(os.getcwd(), tpr)
         self.tprs[step_name] = p_tpr
+        inputs = (geometry, self.top, self.mdps[step_name], trajectory)
+        if not force and _is_up_to_date(p_tpr, *inputs):
+            log.info(f"{p_tpr} is up to date; not running grompp")
+            self._reuse_output(f"compile_{step_name}_out")
+            self._reuse_output(f"compile_{step_name}_err")
+            return p_tpr
         g_tools = gromacs.tools
         if hasattr(g_tools, "Grompp"):
             grompp_cls = g_tools.Grompp
@@ -188,33 +396,56 @@ class Simulation(object):
                 "Could not find grompp executable using gromacswrapper package",
             )
         grompp_func = grompp_cls(failure="warn")
+        # a tpr left from an earlier run must not survive a failed grompp,
+        # or mdrun would be skipped as up to date with the old parameters
+        _remove_if_exists(p_tpr)
         rc, output, err = grompp_func(
-            c=geometry,
-            p=self.top,
-            f=self.mdps[step_name],
+            c=os.fspath(geometry),
+            p=os.fspath(self.top),
+            f=os.fspath(self.mdps[step_name]),
             o=tpr,
-            t=trajectory,
+            t=None if trajectory is None else os.fspath(trajectory),
             maxwarn=max_warn,
             stdout=False,
             stderr=False,
         )
-        self.outputs["compile_{}_out".format(step_name)] = output
-        self.outputs["compile_{}_err".format(step_name)] = err
+        self._store_output(f"compile_{step_name}_out", output)
+        self._store_output(f"compile_{step_name}_err", err)
+        if rc != 0:
+            log.warning(f"grompp failed with exit status {rc} for step {step_name}")
         return p_tpr
 
-    def _run_mdrun(self, step_name: str, tpr: GenPath = None) -> pathlib.Path:
+    def _run_mdrun(
+        self,
+        step_name: str,
+        tpr: GenPath = None,
+        gmx_args: dict = None,
+        force: bool = False,
+    ) -> pathlib.Path:
         """
         Run mdrun with the given step_name or explicitly given tpr file.
 
         :param step_name: The name of this step
         :param tpr: Path to the tpr file. If None, the tpr will be found
             from the dict :attr:`tprs` with the key being `step_name`
+        :param gmx_args: extra arguments for mdrun, added to (and overriding)
+            :attr:`mdrun_args`
+        :param force: If False, mdrun is skipped when the output geometry
+            already exists and is newer than the tpr file.
         :return: The Path to the output geometry
         """
         tpr = self.tprs[step_name] if tpr is None else tpr
-        deffnm = "{}-{}-out".format(self.name, step_name)
-        p_deffnm = self._fp(deffnm)
+        deffnm = f"{self.name}-{step_name}-out"
+        p_deffnm = pathlib.Path(os.getcwd(), deffnm)
         self.deffnms[step_name] = p_deffnm
+        gro = p_deffnm.with_suffix(".gro")
+        if not force and _is_up_to_date(gro, tpr):
+            log.info(f"{gro} is up to date; not running mdrun")
+            self._reuse_output(f"run_{step_name}_out")
+            self._reuse_output(f"run_{step_name}_err")
+            self.geometries[step_name] = gro
+            self._last_geom_key = step_name
+            return gro
         g_tools = gromacs.tools
         if hasattr(g_tools, "Mdrun"):
             mdrun_cls = g_tools.Mdrun
@@ -223,16 +454,109 @@ class Simulation(object):
         else:
             raise OSError(
                 errno.ENOENT,
-                "Could not find mdrun executable " "using gromacswrapper package",
+                "Could not find mdrun executable using gromacswrapper package",
             )
         mdrun_func = mdrun_cls(failure="warn")
-        rc, output, err = mdrun_func(s=tpr, deffnm=deffnm, stdout=False, stderr=False)
-        self.outputs["run_{}_out".format(step_name)] = output
-        self.outputs["run_{}_err".format(step_name)] = err
-        gro = p_deffnm.with_suffix(".gro")
+        # likewise, a failed mdrun must not leave an old output geometry
+        _remove_if_exists(gro)
+        args = dict(self.mdrun_args)
+        if gmx_args is not None:
+            args.update(gmx_args)
+        rc, output, err = mdrun_func(
+            s=os.fspath(tpr), deffnm=deffnm, stdout=False, stderr=False, **args
+        )
+        self._store_output(f"run_{step_name}_out", output)
+        self._store_output(f"run_{step_name}_err", err)
+        if rc != 0:
+            log.warning(f"mdrun failed with exit status {rc} for step {step_name}")
         self.geometries[step_name] = gro
+        self._last_geom_key = step_name
         return gro
 
+    def _store_output(self, key: str, text: str):
+        """
+        Save output from a GROMACS program in :attr:`outputs`
+
+        Unless :attr:`keep_output_in_memory` is True, the text is written to
+        '{key}.log' in the current (step) folder, and only that path is kept.
+        """
+        if self.keep_output_in_memory:
+            self.outputs[key] = text
+        else:
+            path = pathlib.Path(os.getcwd(), f"{key}.log")
+            path.write_text("" if text is None else text)
+            self.outputs[key] = path
+
+    def _reuse_output(self, key: str):
+        """Put the log from an earlier run of a skipped program in outputs"""
+        path = pathlib.Path(os.getcwd(), f"{key}.log")
+        if path.is_file():
+            self.outputs[key] = path.read_text() if self.keep_output_in_memory else path
+
+
+def _next_index(listing: tuple) -> int:
+    """Return the index after the last of a sorted step folder listing"""
+    return listing[-1][0] + 1 if listing else 1
+
+
+@functools.lru_cache(maxsize=None)
+def _step_folder_re(step_name: str, sim_name: str) -> typing.Pattern:
+    """Return the regex matching the folder names for a step"""
+    return re.compile(rf"\d{{2}}-{re.escape(step_name)}-{re.escape(sim_name)}$")
+
+
+def _stat_key(path: pathlib.Path) -> typing.Optional[tuple]:
+    """Return (st_mtime_ns, st_size) of path, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cached_text(cache: dict, path: pathlib.Path) -> str:
+    """
+    Return the text of path, from cache if the file has not changed
+
+    The cache maps paths to ((st_mtime_ns, st_size), text). Files modified
+    within the last couple of seconds are read but not cached, because a
+    further edit within the same timestamp tick could leave the key as is.
+    """
+    stat = _stable_stat(path)
+    key = None if stat is None else (stat.st_mtime_ns, stat.st_size)
+    cached = cache.get(path)
+    if key is not None and cached is not None and cached[0] == key:
+        return cached[1]
+    text = path.read_text()
+    if key is not None:
+        cache[path] = (key, text)
+    return text
+
+
+def _is_up_to_date(target: GenPath, *sources: GenPath) -> bool:
+    """
+    Return True if target exists and is newer than all the given sources
+
+    Sources that are None are ignored. If any other source is missing (e.g.,
+    the tpr from a failed grompp), the target is not up to date.
+    """
+    try:
+        target_mtime = os.stat(target).st_mtime_ns
+        return all(
+            os.stat(source).st_mtime_ns <= target_mtime
+            for source in sources
+            if source is not None
+        )
+    except FileNotFoundError:
+        return False
+
+
+def _remove_if_exists(path: GenPath):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
 
 _type_mol_inputs = typing.Union[str, typing.List[typing.Union[dict, Molecule]]]
 
@@ -265,7 +589,7 @@ class SimpleSimulation(object):
         mol_inputs: _type_mol_inputs = "ask",
         solvent_dielectric: float = 9.1,  # DCM
     ):
-        log.info("Instantiating a SimpleSimulation named {}".format(name))
+        log.info(f"Instantiating a SimpleSimulation named {name}")
         self.name = name
         self.molecules = list()  # type: typing.List[Molecule]
         self.directories = dict()  # type: typing.Dict[str, pathlib.Path]
@@ -281,41 +605,61 @@ class SimpleSimulation(object):
 
     def _process_mol_inputs(self, mol_inputs):
         if mol_inputs == "ask":
-            more = True
-            while more:
-                self.molecules.append(Molecule.assisted())
-                more = (
-                    True if "y" in input("Any more molecules? [yn]").lower() else False
-                )
-        elif isinstance(mol_inputs, typing.Sequence):
-            if isinstance(mol_inputs[0], Molecule):
-                self.molecules = mol_inputs
+            n_mols = input(
+                "How many molecules? (leave blank to be asked after each one) "
+            ).strip()
+            if n_mols.isdigit():
+                self.molecules = [Molecule.assisted() for _ in range(int(n_mols))]
             else:
-                for mol in mol_inputs:
-                    self.molecules.append(Molecule.from_make_mol_inputs(mol))
+                more = True
+                while more:
+                    self.molecules.append(Molecule.assisted())
+                    more = (
+                        True
+                        if "y" in input("Any more molecules? [yn]").lower()
+                        else False
+                    )
+        elif isinstance(mol_inputs, collections.abc.Sequence):
+            # each item can be a Molecule or the inputs to make one
+            self.molecules = [
+                mol if isinstance(mol, Molecule) else Molecule.from_make_mol_inputs(mol)
+                for mol in mol_inputs
+            ]
         elif isinstance(mol_inputs, Molecule):
             self.molecules = [mol_inputs]
         else:
             try:
-                self.molecules = Molecule.from_make_mol_inputs(mol_inputs)
+                self.molecules = [Molecule.from_make_mol_inputs(mol_inputs)]
             except KeyError:  # maybe other Errors?
-                raise ValueError("Unrecognized input: {}".format(mol_inputs))
-        dirs = {"molecule_{}".format(mol.name): mol.directory for mol in self.molecules}
+                raise ValueError(f"Unrecognized input: {mol_inputs}")
+        dirs = {f"molecule_{mol.name}": mol.directory for mol in self.molecules}
         self.directories.update(dirs)
 
-    def parameterize(self):
+    def parameterize(self, parallel: bool = True):
         """
         Parameterize all Molecules in this SimpleSimulation
 
+        The Molecules are independent, so by default they are parameterized
+        at the same time in a thread pool (most of the time is spent
+        waiting for acpype subprocesses).
+
+        :param parallel: If False, parameterize the Molecules one at a time
         :return: None
         """
-        log.info("Parameterizing the {} Molecules".format(len(self.molecules)))
+        log.info(f"Parameterizing the {len(self.molecules)} Molecules")
         # TODO optionally include position restraints?
         # was necessary before otherwise they just flew apart
         # low dielectric might make it less necessary
         # especially if they're oppositely charged, but not regularly the case
-        for mol in self.molecules:
-            mol.parameterize()
+        if parallel and len(self.molecules) > 1:
+            max_workers = min(len(self.molecules), os.cpu_count() or 1)
+            with concurrent.futures.ThreadPoolExecutor(max_workers) as ex:
+                futures = [ex.submit(mol.parameterize) for mol in self.molecules]
+                for future in futures:
+                    future.result()  # raise any exception from the threads
+        else:
+            for mol in self.molecules:
+                mol.parameterize()
         self._steps["parameterized"] = True
 
     def combine(self, box_length: float = None, include_gbsa: bool = False):
@@ -327,11 +671,7 @@ class SimpleSimulation(object):
         topology file
         :return: None
         """
-        log.info(
-            "Combining the {} Molecules into a single System".format(
-                len(self.molecules)
-            )
-        )
+        log.info(f"Combining the {len(self.molecules)} Molecules into a single System")
         if box_length is not None:
             d_box_length = {"box_length": box_length}
         else:
@@ -361,8 +701,7 @@ class SimpleSimulation(object):
         :return: None
         """
         log.info(
-            "Creating a Simulation object from the {} "
-            "System object".format(self.system.name)
+            f"Creating a Simulation object from the {self.system.name} System object"
         )
         self.directories["simulation_base"] = self.system.directory
         solvent_model_dict = {
@@ -388,60 +727,64 @@ class SimpleSimulation(object):
         """
         Use Python format ({}) to put dielectric constant into given mdp files
 
+        The template texts are cached together with the modification time and
+        size of each file, so a sweep over dielectrics does not read them
+        again, but edits to them are still picked up. An output file is not
+        written again (or read) if the same text was last written to it and
+        its modification time and size have not changed since.
+
         :param dict mdps: dict of step names to strings of path to existing
             mdp files
         :return: dict of step names to strings ot paths to edited mdp files
             (now in a folder specific to this simulation)
         """
         _dir = self.directories["simulation_base"]
+        # (created here so that SimpleSimulations pickled before these
+        # caches existed still load)
+        templates = self.__dict__.setdefault("_mdp_templates", dict())
+        written = self.__dict__.setdefault("_mdps_written", dict())
         d_out = dict()
         for key in mdps:
             old_path = pathlib.Path(mdps[key])
             new_path = _dir / old_path.name
-            text = old_path.read_text()
-            text = text.format(dielectric=self._dielectric)
-            new_path.write_text(text)
-            log.info(
-                "wrote {} mdp with dielectric replaced to {}".format(key, new_path)
+            text = _cached_text(templates, old_path).format(
+                dielectric=self._dielectric
             )
+            if written.get(new_path) == (text, _stat_key(new_path)):
+                # leave it (and its mtime) alone
+                log.info(f"{key} mdp already up to date at {new_path}")
+            else:
+                new_path.write_text(text)
+                log.info(f"wrote {key} mdp with dielectric replaced to {new_path}")
+                written[new_path] = (text, _stat_key(new_path))
             d_out[key] = str(new_path)
         return d_out
 
     def save(self):
-        path = pathlib.Path("{}.pkl".format(self.name))
+        path = pathlib.Path(f"{self.name}.pkl")
         if self._steps["simulation_created"]:
             # This doesn't work...
             # TODO find a way around this (just don't save Sim?)
-            raise AttributeError(
-                "Cannot save SimpleSimulation after making " "simulation"
-            )
+            raise AttributeError("Cannot save SimpleSimulation after making simulation")
         pickle.dump(self, path.open("wb"))
-        log.info("Saved SimpleSimulation to {}".format(path))
+        log.info(f"Saved SimpleSimulation to {path}")
 
     @classmethod
     def load(cls, name: str):
-        path = pathlib.Path("{}.pkl".format(name))
+        path = pathlib.Path(f"{name}.pkl")
         if not path.exists():
-            raise FileNotFoundError(
-                "Could not find save file for this name: " "{}".format(path)
-            )
+            raise FileNotFoundError(f"Could not find save file for this name: {path}")
         ssim = pickle.load(path.open("rb"))
         if not isinstance(ssim, cls):
             raise TypeError(
-                "The loaded pickle file ({}) is not of the "
-                "correct type: {}".format(path, cls)
+                f"The loaded pickle file ({path}) is not of the correct type: {cls}"
             )
         return ssim
 
     def __repr__(self):
+        steps = self._steps
         return (
-            "<{} SimpleSimulation with {} Molecules; params: {}; "
-            "combined: {}, sim made: "
-            "{}>".format(
-                self.name,
-                self.n_molecules,
-                self._steps["parameterized"],
-                self._steps["combined"],
-                self._steps["simulation_created"],
-            )
+            f"<{self.name} SimpleSimulation with {self.n_molecules} Molecules; "
+            f"params: {steps['parameterized']}; combined: {steps['combined']}, "
+            f"sim made: {steps['simulation_created']}>"
         )
@@ -31,7 +31,7 @@ import errno
 import numpy as np
 import os
 import shutil
-import sys
+import time
 
 
 __all__ = [
@@ -43,29 +43,40 @@ __all__ = [
     "running_mean",
 ]
 
-if sys.version_info >= (3, 6):
 
-    @contextmanager
-    def cd(new_dir):
-        prev_dir = os.getcwd()
-        os.chdir(os.path.expanduser(new_dir))
-        try:
-            yield
-        finally:
-            os.chdir(prev_dir)
+# files modified more recently than this may change again without their
+# mtime changing (coarse timestamp ticks), so they are not cached
+_RACY_MTIME = 2.0  # seconds
 
 
-else:
+def _stable_stat(path):
+    """
+    Return os.stat of path, or None if its mtime cannot be trusted yet
+
+    Caches keyed on st_mtime_ns (and st_size) use this so that a file or
+    folder modified within the last couple of seconds is never cached: a
+    second change within the same timestamp tick would not change its
+    mtime, and the stale entry would then look current forever.
 
-    @contextmanager
-    def cd(new_dir):
-        new_dir = str(new_dir)
-        prev_dir = os.getcwd()
-        os.chdir(os.path.expanduser(new_dir))
-        try:
-            yield
-        finally:
-            os.chdir(prev_dir)
+    :param path: File or folder to stat
+    :return: the stat result, or None if it was modified too recently
+    :rtype: Optional[os.stat_result]
+    """
+    stat = os.stat(path)
+    # (not time.time_ns, which needs Python 3.7)
+    if time.time() - stat.st_mtime < _RACY_MTIME:
+        return None
+    return stat
+
+
+@contextmanager
+def cd(new_dir):
+    prev_dir = os.getcwd()
+    os.chdir(os.path.expanduser(new_dir))
+    try:
+        yield
+    finally:
+        os.chdir(prev_dir)
 
 
 def copy_no_overwrite(src, dst, silent=False):
@@ -183,7 +194,10 @@ def running_mean(x, n=2):
     :return: Array of the running mean values.
     :rtype: np.ndarray
     """
-    if len(x) != 0:
-        return np.convolve(x, np.ones((n,)) / n, mode="valid")
-    else:
+    x = np.asarray(x, dtype=float)
+    if len(x) == 0:
         raise ValueError("x cannot be empty")
+    if n == 2:
+        # the common case (bin midpoints); avoids the convolution setup
+        return (x[1:] + x[:-1]) / 2
+    return np.convolve(x, np.ones((n,)) / n, mode="valid")
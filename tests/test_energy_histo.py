@@ -25,7 +25,9 @@
 from __future__ import absolute_import
 
 import numpy as np
+import os
 import pathlib
+import pytest
 
 from paratemp.tools import cd
 import re
@@ -87,3 +89,121 @@ class TestImportEnergies(object):
         for d in data:
             assert isinstance(d, np.ndarray)
         assert len(data) == 2
+
+
+@pytest.fixture
+def xvg_path(tmp_path: pathlib.PosixPath):
+    path = tmp_path / 'energy0.xvg'
+    path.write_text('# This file was created by a test\n'
+                    '@    title "GROMACS Energies"\n'
+                    '@    xaxis  label "Time (ps)"\n'
+                    '@TYPE xy\n'
+                    '    0.000000  -1234.500000\n'
+                    '    2.000000  -1230.250000\n'
+                    '    4.000000  -1236.125000\n')
+    return path
+
+
+def test_read_xvg_fast(xvg_path: pathlib.PosixPath):
+    import gromacs.formats
+    from paratemp.energy_histo import _read_xvg_fast
+    data = _read_xvg_fast(str(xvg_path))
+    assert data.shape == (2, 3)
+    ref = gromacs.formats.XVG(filename=str(xvg_path)).array
+    assert np.allclose(data, ref)
+
+
+def test_import_energies_from_xvgs(xvg_path: pathlib.PosixPath):
+    from paratemp.energy_histo import import_energies
+    data, lengths = import_energies([str(xvg_path)] * 2, return_lengths=True)
+    assert len(data) == 2
+    assert lengths == [3, 3]
+    assert np.allclose(data[0], [-1234.5, -1230.25, -1236.125])
+
+
+class TestCachedXVG(object):
+
+    @staticmethod
+    def settle(path):
+        """Give path an old mtime so that it can be cached"""
+        os.utime(str(path), ns=(0, 0))
+
+    def test_writes_and_uses_sidecar(self, xvg_path: pathlib.PosixPath):
+        from paratemp.energy_histo import _cached_xvg
+        self.settle(xvg_path)
+        data = _cached_xvg(xvg_path)
+        npy_path = xvg_path.with_name(xvg_path.name + '.npy')
+        assert npy_path.exists()
+        assert list(xvg_path.parent.glob('*.tmp')) == []
+        cached = _cached_xvg(xvg_path)
+        assert isinstance(cached, np.memmap)
+        assert np.array_equal(data, cached)
+
+    def test_sidecar_invalidated(self, xvg_path: pathlib.PosixPath):
+        from paratemp.energy_histo import _cached_xvg
+        self.settle(xvg_path)
+        _cached_xvg(xvg_path)
+        old = _cached_xvg(xvg_path)
+        assert isinstance(old, np.memmap)
+        with xvg_path.open('a') as f_out:
+            f_out.write('    6.000000  -1232.000000\n')
+        data = _cached_xvg(xvg_path)
+        assert data.shape == (2, 4)
+        assert not isinstance(data, np.memmap)
+        self.settle(xvg_path)
+        _cached_xvg(xvg_path)
+        assert _cached_xvg(xvg_path).shape == (2, 4)
+        # the sidecar was replaced, not rewritten under the old memmap
+        assert old.shape == (2, 3)
+        assert np.allclose(old[1], [-1234.5, -1230.25, -1236.125])
+
+    def test_cached_files_read_in_process(self, xvg_path: pathlib.PosixPath,
+                                          monkeypatch):
+        import paratemp.energy_histo
+        from paratemp.energy_histo import import_energies
+        xvg_path_2 = xvg_path.with_name('energy1.xvg')
+        xvg_path_2.write_text(xvg_path.read_text())
+        self.settle(xvg_path)
+        self.settle(xvg_path_2)
+        import_energies([str(xvg_path), str(xvg_path_2)])
+
+        def fail(*args, **kwargs):
+            raise AssertionError('process pool used for cached files')
+        monkeypatch.setattr(paratemp.energy_histo, 'ProcessPoolExecutor',
+                            fail)
+        data = import_energies([str(xvg_path), str(xvg_path_2)])
+        assert all(isinstance(arr, np.memmap) for arr in data)
+
+    def test_recent_file_not_cached(self, xvg_path: pathlib.PosixPath):
+        from paratemp.energy_histo import _cached_xvg
+        data = _cached_xvg(xvg_path)
+        assert data.shape == (2, 3)
+        assert not xvg_path.with_name(xvg_path.name + '.npy').exists()
+
+
+def test_combine_energy_files(xvg_path: pathlib.PosixPath):
+    from paratemp.energy_histo import combine_energy_files, _read_xvg_fast
+    xvg_path_2 = xvg_path.with_name('energy1.xvg')
+    with xvg_path.open('a') as f_out:
+        f_out.write('    6.000000  -1232.000000\n')
+    xvg_path_2.write_text(xvg_path.read_text().replace('-12', '-13'))
+    with cd(xvg_path.parent):
+        combine_energy_files()
+    data = _read_xvg_fast(xvg_path.with_name('energy_comb.xvg'))
+    assert data.shape == (3, 4)
+    assert np.allclose(data[0], [0., 2., 4., 6.])
+    assert np.allclose(data[1], _read_xvg_fast(xvg_path)[1])
+    assert np.allclose(data[2], _read_xvg_fast(xvg_path_2)[1])
+
+
+def test_deconvolve_energies(tmp_path: pathlib.PosixPath):
+    from paratemp.energy_histo import deconvolve_energies, _write_xvg
+    times = np.arange(4) * 2.
+    energies = np.array([times, [10., 11., 12., 13.], [20., 21., 22., 23.]])
+    indices = np.array([times, [0, 1, 1, 0], [1, 0, 0, 1]])
+    _write_xvg(str(tmp_path / 'e.xvg'), energies)
+    _write_xvg(str(tmp_path / 'i.xvg'), indices)
+    walkers = deconvolve_energies(str(tmp_path / 'e.xvg'),
+                                  str(tmp_path / 'i.xvg'))
+    assert np.array_equal(walkers, [[10., 21., 22., 13.],
+                                    [20., 11., 12., 23.]])
@@ -50,6 +50,61 @@ class TestXYZ(object):
     def test_distance(self, xyz):
         assert xyz.distance_between(41, 40) == pytest.approx(3.891653)
 
+    def test_distances(self, xyz):
+        dists = xyz.distances([41, 9], [40, 13])
+        assert dists.shape == (2,)
+        assert dists[0] == pytest.approx(3.891653)
+        assert dists[1] == pytest.approx(xyz.distance_between(9, 13))
+
+    def test_angles(self, xyz):
+        angles = xyz.angles([9, 21], [13, 34], [3, 35])
+        assert angles[0] == pytest.approx(122.521027)
+        assert angles[1] == pytest.approx(xyz.angle_between(21, 34, 35))
+
+    def test_dihedrals(self, xyz):
+        dihedrals = xyz.dihedrals([21, 9], [34, 13], [35, 3], [36, 2])
+        assert dihedrals[0] == pytest.approx(62.085346)
+        assert dihedrals[1] == pytest.approx(
+            xyz.dihedral_between(9, 13, 3, 2))
+
+    def test_coords(self, xyz):
+        assert isinstance(xyz.coords, np.ndarray)
+        assert xyz.coords.shape == (66, 3)
+        assert xyz.coords.dtype == np.float64
+
+    def test_center_and_rotate(self, xyz):
+        dist = xyz.distance_between(3, 13)
+        xyz.center_and_rotate_on(3, 13)
+        assert np.allclose(xyz.coords[3], 0.)
+        assert np.allclose(xyz.coords[13], [dist, 0., 0.])
+        assert xyz.distance_between(3, 13) == pytest.approx(dist)
+
+    def test_move_subset(self, xyz):
+        orig = xyz.coords.copy()
+        xyz.move_subset([1., 2., 3.], [0, 5])
+        assert np.allclose(xyz.coords[[0, 5]], orig[[0, 5]] + [1., 2., 3.])
+        assert np.allclose(xyz.coords[1:5], orig[1:5])
+        assert xyz.original_energy == -1058630.8496721
+
+    def test_move_subset_repeated_index(self, xyz):
+        orig = xyz.coords.copy()
+        xyz.move_subset([1., 0., 0.], [2, 2])
+        assert np.allclose(xyz.coords[2], orig[2] + [2., 0., 0.])
+
+    def test_average_loc(self, xyz):
+        assert np.allclose(xyz.average_loc(0, 1),
+                           (xyz.coords[0] + xyz.coords[1]) / 2)
+        assert np.allclose(xyz.average_loc([0, 1]), xyz.average_loc(0, 1))
+
+    def test_write(self, xyz, tmp_path):
+        from paratemp.geometries import XYZ
+        f_name = tmp_path / 'out.xyz'
+        xyz.write(f_name)
+        new = XYZ(f_name)
+        assert new.atoms == xyz.atoms
+        assert np.allclose(new.coords, xyz.coords)
+        assert new.energy == xyz.energy
+
     def test_bad_lines(self, path_test_data):
         from paratemp.geometries import XYZ
         with pytest.raises(ValueError):
@@ -61,6 +116,16 @@ class TestXYZ(object):
         with pytest.raises(TypeError):
             XYZ(path_test_data / 'empty_line.txt')
 
+    def test_sodium(self, tmp_path):
+        from paratemp.geometries import XYZ
+        f_name = tmp_path / 'nacl.xyz'
+        f_name.write_text('2\n\n'
+                          'NA 0.0 0.0 0.0\n'
+                          'CL 2.8 0.0 0.0\n')
+        xyz = XYZ(f_name)
+        assert xyz.atoms == ['NA', 'CL']
+        assert xyz.distance_between(0, 1) == pytest.approx(2.8)
+
 
 class TestXYZNewline(object):
 
@@ -86,10 +151,44 @@ class TestXYZIndexed(object):
     def test_n_atoms(self, xyz):
         assert xyz.n_atoms == 66
 
+    def test_atom_names(self, xyz, path_test_data):
+        from paratemp.geometries import XYZ
+        assert xyz.atoms == XYZ(path_test_data / 'stil-3htmf.xyz').atoms
+
     def test_energy(self, xyz):
         assert xyz.energy == -1058630.8496721
 
 
+class TestCOM(object):
+
+    com_text = ('%chk=water\n'
+                '#p opt b3lyp/6-31g(d)\n'
+                '\n'
+                'water\n'
+                '\n'
+                '0 1\n'
+                '   O             0.00000    0.00000    0.11779\n'
+                '   H             0.00000    0.75545   -0.47116\n'
+                '   H             0.00000   -0.75545   -0.47116\n'
+                '\n'
+                'footer line\n')
+
+    @pytest.fixture
+    def com(self, tmp_path):
+        from paratemp.geometries import COM
+        f_name = tmp_path / 'water.com'
+        f_name.write_text(self.com_text)
+        return COM(f_name)
+
+    def test_parse(self, com):
+        assert com.atoms == ['O', 'H', 'H']
+        assert com.coords.shape == (3, 3)
+        assert com.distance_between(1, 2) == pytest.approx(1.5109)
+
+    def test_str(self, com):
+        assert str(com) == self.com_text
+
+
 class TestVector(object):
 
     @pytest.fixture
@@ -128,9 +227,24 @@ class TestVector(object):
     def test_input_list(self, x_axis_int, x_axis_int_list):
         assert (x_axis_int_list == x_axis_int).all()
 
+    def test_bad_input(self):
+        from paratemp.geometries import Vector
+        from paratemp.exceptions import InputError
+        with pytest.raises(InputError):
+            Vector()
+        with pytest.raises(InputError):
+            Vector(1, 2)
+        with pytest.raises(InputError):
+            Vector([1, 2, 3, 4])
+
     def test_rotate_x_to_y(self, x_axis_int, y_axis, pi):
         assert np.isclose(x_axis_int.rotate([0, 0, 1], pi/2), y_axis).all()
 
+    def test_rotate_repeated(self, x_axis_int, y_axis, z_axis, pi):
+        assert np.isclose(x_axis_int.rotate(z_axis, pi/2), y_axis).all()
+        assert np.isclose(x_axis_int.rotate(z_axis, pi/2), y_axis).all()
+        assert np.isclose(x_axis_int.rotate(z_axis, -pi/2), -y_axis).all()
+
     def test_diff_angle(self, x_axis_int, y_axis, pi):
         assert x_axis_int.diff_angle(y_axis) == pi/2
 
@@ -25,6 +25,7 @@
 from __future__ import absolute_import
 
 import os
+import pathlib
 import py
 import pytest
 import re
@@ -53,6 +54,24 @@ class TestGetGroFiles(object):
                               time=2)
 
 
+    def test_iter_gro_files(self, pt_run_dir):
+        from paratemp.sim_setup import iter_gro_files
+        with cd(pt_run_dir):
+            gros = iter_gro_files(trr_base='PT-out',
+                                  tpr_base='TOPO/nvt',
+                                  time=2)
+            assert sorted(gros) == ['PT-out0.gro', 'PT-out1.gro']
+
+    def test_iter_raises_on_call(self, pt_run_dir):
+        from paratemp.sim_setup import iter_gro_files
+        with cd(pt_run_dir):
+            open('PT-out2.trr', 'a').close()
+            with pytest.raises(ValueError):
+                iter_gro_files(trr_base='PT-out',
+                               tpr_base='TOPO/nvt',
+                               time=2)
+
+
 def test_job_info_from_qsub():
     from paratemp.sim_setup.sim_setup import _job_info_from_qsub
     job_info = _job_info_from_qsub('Your job 2306551 ("PT-NTD-CG") '
@@ -113,6 +132,72 @@ class TestUpdateNum(object):
             _update_num(match_10, cat_repl_dict=None)
 
 
+class TestUpdatePlumedInput(object):
+
+    plumed_text = ('WHOLEMOLECULES ENTITY0=1-130\n'
+                   'c1: COM ATOMS=1,9,125\n'
+                   'dm1: DISTANCE ATOMS=c1,8\n'
+                   'tr5: TORSION ATOMS=1,2,3,4\n'
+                   'UPPER_WALLS ARG=dm1,dm2 AT=12.0,12.0 '
+                   'KAPPA=150.0,150.0 EXP=2,2\n'
+                   'PRINT ARG=dm1 FILE=COLVAR STRIDE=500\n')
+
+    @pytest.fixture
+    def plumed_in(self, tmp_path):
+        path = tmp_path / 'plumed.dat'
+        path.write_text(self.plumed_text)
+        return path
+
+    def test_update_plumed_input(self, plumed_in):
+        from paratemp.sim_setup import update_plumed_input
+        n_out = plumed_in.with_name('plumed-new.dat')
+        update_plumed_input(str(plumed_in), str(n_out),
+                            num_updater_kwargs=dict(
+                                shift=120, cat_repl_dict={1: 63, 9: 69, 8: 72}))
+        assert n_out.read_text().splitlines() == [
+            'WHOLEMOLECULES ENTITY0=63-10',
+            'c1: COM ATOMS=63,69,5',
+            'dm1: DISTANCE ATOMS=c1,72',
+            'UPPER_WALLS ARG=dm1,dm2 AT=12.0,12.0 KAPPA=150.0,150.0 EXP=2,2']
+
+    def test_equil(self, plumed_in):
+        from paratemp.sim_setup import update_plumed_input
+        n_out = plumed_in.with_name('plumed-equil.dat')
+        update_plumed_input(str(plumed_in), str(n_out),
+                            num_updater=lambda m: m.group(0),
+                            equil=True, equil_changes={'dm1:': ['c1', 'c2']})
+        lines = n_out.read_text().splitlines()
+        assert lines[2] == 'dm1: DISTANCE ATOMS=c2,8'
+        assert lines[3] == ('UPPER_WALLS ARG=dm1,dm2 AT=10.5,10.5 '
+                            'KAPPA=75.0,75.0 EXP=1,1')
+
+    def test_updater_called_once_per_token(self, plumed_in):
+        from paratemp.sim_setup import update_plumed_input
+        seen = []
+
+        def updater(m):
+            seen.append(m.group(0))
+            return m.group(0)
+        n_out = plumed_in.with_name('plumed-memo.dat')
+        update_plumed_input(str(plumed_in), str(n_out), num_updater=updater)
+        assert sorted(seen) == sorted(set(seen))
+        assert n_out.read_text().splitlines()[1] == 'c1: COM ATOMS=1,9,125'
+
+    def test_kw_regex(self):
+        from paratemp.sim_setup.sim_setup import _kw_regex
+        regex = _kw_regex(['c1:', 'FILE=COLVAR'])
+        assert regex.findall('c1: PRINT FILE=COLVAR\n') == ['c1:',
+                                                            'FILE=COLVAR']
+        assert regex.search('dm1: DISTANCE ATOMS=c1:,8') is None
+        assert _kw_regex([]).search('c1: COM') is None
+
+    def test_equil_requires_changes(self, plumed_in):
+        from paratemp.sim_setup import update_plumed_input
+        from paratemp.exceptions import InputError
+        with pytest.raises(InputError):
+            update_plumed_input(str(plumed_in), 'out.dat', equil=True)
+
+
 @pytest.fixture
 def n_top_dc(path_test_data):
     path = path_test_data / 'ptad-cin-cg.top'
@@ -185,11 +270,56 @@ class TestSetSolvCountTop(object):
         set_solv_count_top(n_top_dc, s_count=100)
         assert get_solv_count_top(n_top_dc) == 100
 
+    def test_set_solv_count_top_path(self, n_top_dc):
+        from paratemp.sim_setup import set_solv_count_top, get_solv_count_top
+        set_solv_count_top(pathlib.Path(n_top_dc), s_count=100,
+                           verbose=False)
+        assert get_solv_count_top(n_top_dc) == 100
+        assert not os.path.exists(n_top_dc + '.tmp')
+
     def test_set_solv_count_top_folder(self, folder_dc, n_top_dc):
         from paratemp.sim_setup import set_solv_count_top, get_solv_count_top
         set_solv_count_top(folder=folder_dc, s_count=50)
         assert get_solv_count_top(n_top_dc) == 50
 
+    def test_set_solv_count_top_only_count_changed(self, n_top_dc):
+        from paratemp.sim_setup import set_solv_count_top
+        with open(n_top_dc) as f_top:
+            orig_lines = f_top.readlines()
+        set_solv_count_top(n_top_dc, s_count=42, verbose=False)
+        with open(n_top_dc) as f_top:
+            new_lines = f_top.readlines()
+        b_path = os.path.join(os.path.dirname(n_top_dc),
+                              'unequal-' + os.path.basename(n_top_dc))
+        with open(b_path) as f_bak:
+            assert f_bak.readlines() == orig_lines
+        assert not os.path.exists(n_top_dc + '.tmp')
+        diff = [(o, n) for o, n in zip(orig_lines, new_lines) if o != n]
+        assert len(new_lines) == len(orig_lines)
+        assert diff == [(o, o.replace('361', '42')) for o, _ in diff]
+        assert len(diff) == 1
+
+    def test_set_solv_count_top_backup_exists(self, n_top_dc):
+        from paratemp.sim_setup import set_solv_count_top, get_solv_count_top
+        set_solv_count_top(n_top_dc, s_count=42, verbose=False)
+        with pytest.raises(OSError):
+            set_solv_count_top(n_top_dc, s_count=43, verbose=False)
+        assert get_solv_count_top(n_top_dc) == 42
+        assert not os.path.exists(n_top_dc + '.tmp')
+
+    @pytest.mark.parametrize('chunk', [8, 30, 1 << 16])
+    def test_set_solv_count_top_tail_read(self, tmpdir, monkeypatch, chunk):
+        from paratemp.sim_setup import sim_setup
+        monkeypatch.setattr(sim_setup, '_TAIL_CHUNK', chunk)
+        n_top = tmpdir.join('crlf.top')
+        text = ('; [ molecules ]\r\n#include "dcm.itp"\r\n\r\n'
+                '[ molecules ]\r\n; Compound  #mols\r\ncinna  1\r\n'
+                'DCM    361\r\n')
+        n_top.write_binary(text.encode())
+        sim_setup.set_solv_count_top(str(n_top), s_count=5, verbose=False)
+        assert n_top.read_binary() == text.replace('361', '5').encode()
+        assert tmpdir.join('unequal-crlf.top').read_binary() == text.encode()
+
     def test_set_solv_count_top_no_change(self, folder_dc, n_top_dc, capsys):
         from paratemp.sim_setup import set_solv_count_top, \
             get_solv_count_top
@@ -220,6 +350,43 @@ class TestSetSolvCountTop(object):
             _get_n_top(None, str(tmpdir))
 
 
+class TestCachedGlob(object):
+
+    def test_sees_new_files(self, tmpdir):
+        from paratemp.sim_setup.sim_setup import _cached_glob
+        assert _cached_glob(str(tmpdir), '*.top') == tuple()
+        tmpdir.join('a.top').ensure()
+        assert _cached_glob(str(tmpdir), '*.top') == (
+            str(tmpdir.join('a.top')),)
+        tmpdir.join('a.top').remove()
+        assert _cached_glob(str(tmpdir), '*.top') == tuple()
+
+    def test_get_n_top_reuses_listing(self, tmpdir):
+        from paratemp.sim_setup.sim_setup import _get_n_top, _glob_in
+        n_top = tmpdir.join('a.top').ensure()
+        # make the folder look settled so its listing is cached
+        os.utime(str(tmpdir), ns=(0, 0))
+        _glob_in.cache_clear()
+        assert _get_n_top(None, str(tmpdir)) == str(n_top)
+        assert _get_n_top(None, str(tmpdir)) == str(n_top)
+        assert _glob_in.cache_info().hits == 1
+        tmpdir.join('b.top').ensure()
+        with pytest.raises(ValueError):
+            _get_n_top(None, str(tmpdir))
+
+
+def test_copy_topology(tmpdir):
+    from paratemp.sim_setup import copy_topology
+    f_from = tmpdir.mkdir('from')
+    for name in ('a.top', 'b.itp', 'c.gro', '.hidden.itp'):
+        f_from.join(name).write(name)
+    f_from.mkdir('d.itp')
+    f_to = tmpdir.join('to')
+    copy_topology(str(f_from), str(f_to))
+    assert sorted(p.basename for p in f_to.listdir()) == ['a.top', 'b.itp']
+    assert f_to.join('b.itp').read() == 'b.itp'
+
+
 class TestMakeGROMACSSubScript(object):
 
     @pytest.fixture
@@ -276,7 +443,7 @@ class TestMakeGROMACSSubScript(object):
         line = _get_mdrun_line(**kwargs)
         ref_line = ('mpirun -n $NSIMS --map-by node -x OMP_NUM_THREADS ' 
                     'mdrun_mpi -s TOPO/npt -deffnm PT-out -plumed ' 
-                    'plumed.dat -multi 4 -replex 1000 -cpi PT-out ')
+                    'plumed.dat -multi 4 -replex 1000 -cpi PT-out')
         assert line == ref_line
         kwargs['multi'] = 4
         kwargs['nsims'] = 'wrong'
@@ -285,7 +452,7 @@ class TestMakeGROMACSSubScript(object):
         other = '-nsteps 500'
         kwargs['other_mdrun'] = other
         line = _get_mdrun_line(**kwargs)
-        assert line == ref_line + other
+        assert line == ref_line + ' ' + other
 
     def test_get_sge_basic_lines(self):
         from paratemp.sim_setup.sim_setup import _get_sge_basic_lines
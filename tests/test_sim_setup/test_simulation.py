@@ -24,12 +24,41 @@
 
 from __future__ import absolute_import
 
+import os
 import pathlib
 import pytest
+import time
 
 from paratemp.tools import cd
 
 
+def test_resolve_path(tmp_path):
+    from paratemp.sim_setup.simulation import resolve_path
+    target = tmp_path / 'target.txt'
+    target.touch()
+    link = tmp_path / 'link.txt'
+    link.symlink_to(target)
+    with cd(tmp_path):
+        path = resolve_path('sub/../link.txt')
+    assert isinstance(path, pathlib.Path)
+    assert path == tmp_path / 'link.txt'
+    assert resolve_path(link, resolve_symlinks=True) == target.resolve()
+
+
+def test_is_up_to_date(tmp_path):
+    from paratemp.sim_setup.simulation import _is_up_to_date
+    source, target = tmp_path / 'source', tmp_path / 'target'
+    assert not _is_up_to_date(target, source)
+    source.touch()
+    target.touch()
+    os.utime(str(source), ns=(2, 2))
+    os.utime(str(target), ns=(1, 1))
+    assert not _is_up_to_date(target, source, None)
+    os.utime(str(target), ns=(3, 3))
+    assert _is_up_to_date(target, source, None)
+    assert not _is_up_to_date(target, source, tmp_path / 'missing')
+
+
 class TestSimulation(object):
 
     def test_runs(self, pt_blank_dir):
@@ -66,6 +95,7 @@ class TestSimulation(object):
              'top': pathlib.Path,
              'base_folder': pathlib.Path,
              'mdps': dict,
+             'mdrun_args': dict,
              'tprs': dict,
              'deffnms': dict,
              'outputs': dict,
@@ -84,6 +114,87 @@ class TestSimulation(object):
         assert hasattr(sim, step)
         assert callable(getattr(sim, step))
 
+    def test_step_methods_made_once(self, sim):
+        assert 'minimize' not in vars(sim)
+        assert sim.minimize is sim.minimize
+        with pytest.raises(AttributeError):
+            sim.not_a_step
+
+    def test_lazy_queues_steps(self, pt_blank_dir):
+        from paratemp.sim_setup import Simulation
+        sim = Simulation(name='lazy_sim',
+                         gro=str(pt_blank_dir / 'PT-out0.gro'),
+                         top=str(pt_blank_dir / 'spc-and-methanol.top'),
+                         base_folder=str(pt_blank_dir),
+                         mdps=self.mdps, lazy=True)
+        assert sim.minimize() is None
+        assert sim.equilibrate(max_warn=1) is None
+        assert [name for name, _ in sim._graph] == ['minimize', 'equilibrate']
+        assert sim._graph[1][1]['max_warn'] == 1
+        assert sim._next_folder_index == 1  # nothing was run
+        with pytest.raises(KeyError):
+            sim.run_until('production')
+
+    def test_skips_up_to_date_step(self, sim):
+        base = sim.base_folder
+        folder = base / '01-minimize-sim_fixture'
+        folder.mkdir()
+        tpr = folder / 'sim_fixture-minimize.tpr'
+        tpr.touch()
+        gro = folder / 'sim_fixture-minimize-out.gro'
+        gro.touch()
+        (folder / 'run_minimize_out.log').write_text('old output')
+        # make the outputs newer than the inputs without running GROMACS
+        future = int(time.time() * 10**9) + 10**12
+        os.utime(str(tpr), ns=(future, future))
+        os.utime(str(gro), ns=(future + 1, future + 1))
+        assert sim.minimize() == folder
+        assert sim.last_geometry == gro
+        assert sim.outputs['run_minimize_out'] == (folder /
+                                                   'run_minimize_out.log')
+        # running it again in this session does not reuse the folder
+        assert sim._existing_step_folder('minimize') is None
+
+    def test_reuses_repeated_step_folders_in_order(self, sim):
+        base = sim.base_folder
+        names = ['01-minimize-sim_fixture', '02-equilibrate-sim_fixture',
+                 '03-minimize-sim_fixture']
+        for name in names:
+            (base / name).mkdir()
+        folders = [sim._setup_for_step(None, step, reuse=True)[0]
+                   for step in ('minimize', 'equilibrate', 'minimize',
+                                'minimize')]
+        assert folders[:3] == [base / name for name in names]
+        assert folders[3] == base / '04-minimize-sim_fixture'
+
+    def test_failed_rerun_leaves_no_stale_outputs(self, sim, monkeypatch,
+                                                 caplog):
+        import gromacs.tools
+
+        class Failing(object):
+            def __init__(self, **kwargs):
+                pass
+
+            def __call__(self, **kwargs):
+                return 1, 'output', 'error'
+        monkeypatch.setattr(gromacs.tools, 'Grompp', Failing, raising=False)
+        monkeypatch.setattr(gromacs.tools, 'Mdrun', Failing, raising=False)
+        folder = sim.base_folder / '01-minimize-sim_fixture'
+        folder.mkdir()
+        tpr = folder / 'sim_fixture-minimize.tpr'
+        gro = folder / 'sim_fixture-minimize-out.gro'
+        tpr.touch()
+        gro.touch()
+        # the tpr is older than its inputs (e.g., an edited mdp), but the
+        # old output is still newer than the tpr
+        os.utime(str(tpr), ns=(10**9, 10**9))
+        os.utime(str(gro), ns=(2 * 10**9, 2 * 10**9))
+        assert sim.minimize() == folder
+        assert not tpr.exists()
+        assert not gro.exists()
+        assert 'grompp failed' in caplog.text
+        assert 'mdrun failed' in caplog.text
+
     def test_fp(self, sim):
         sample_file = 'tests/__init__.py'
         fp = sim._fp(sample_file)
@@ -92,6 +203,26 @@ class TestSimulation(object):
         assert fp.is_file()
         assert fp.samefile(sample_file)
 
+    def test_fp_cached_per_directory(self, sim, tmp_path):
+        (tmp_path / 'a').mkdir()
+        (tmp_path / 'b').mkdir()
+        with cd(tmp_path / 'a'):
+            fp_a = sim._fp('x.tpr')
+            assert sim._fp('x.tpr') is fp_a
+        with cd(tmp_path / 'b'):
+            fp_b = sim._fp('x.tpr')
+        assert fp_a == tmp_path / 'a' / 'x.tpr'
+        assert fp_b == tmp_path / 'b' / 'x.tpr'
+
+    def test_store_output(self, sim, tmp_path):
+        with cd(tmp_path):
+            sim._store_output('run_x_out', 'some output')
+        assert sim.outputs['run_x_out'] == tmp_path / 'run_x_out.log'
+        assert sim.outputs['run_x_out'].read_text() == 'some output'
+        sim.keep_output_in_memory = True
+        sim._store_output('run_x_out', 'in memory')
+        assert sim.outputs['run_x_out'] == 'in memory'
+
     def test_last_geom(self, sim):
         gro = sim.last_geometry
         assert isinstance(gro, pathlib.Path)
@@ -119,6 +250,54 @@ class TestSimulation(object):
             path.joinpath('07-dont_work_none').mkdir()
         assert sim._next_folder_index == 6
 
+    def test_next_folder_index_cached(self, sim, monkeypatch):
+        # make the folder look settled so the index is cached
+        os.utime(str(sim.base_folder), ns=(0, 0))
+        assert sim._next_folder_index == 1
+
+        def fail(*args):
+            raise AssertionError('base_folder listed again')
+        monkeypatch.setattr(os, 'scandir', fail)
+        assert sim._next_folder_index == 1
+
+    def test_one_listing_per_step(self, sim, monkeypatch):
+        scandir = os.scandir
+        calls = []
+
+        def counting_scandir(path):
+            calls.append(path)
+            return scandir(path)
+        monkeypatch.setattr(os, 'scandir', counting_scandir)
+        for i, step in enumerate(('minimize', 'equilibrate', 'minimize')):
+            sim._setup_for_step(None, step, reuse=True)
+            # settle base_folder as if the step took a while to run
+            os.utime(str(sim.base_folder), ns=(i * 10**9, i * 10**9))
+        assert len(calls) == 3
+        assert sim._next_folder_index == 4
+
+    def test_own_folders_do_not_relist(self, sim, monkeypatch):
+        import paratemp.sim_setup.simulation
+        # treat base_folder as settled, as it is when steps take a while
+        monkeypatch.setattr(paratemp.sim_setup.simulation, '_stable_stat',
+                            os.stat)
+        scandir = os.scandir
+        calls = []
+
+        def counting_scandir(path):
+            calls.append(path)
+            return scandir(path)
+        monkeypatch.setattr(os, 'scandir', counting_scandir)
+        for step in ('minimize', 'equilibrate', 'minimize'):
+            sim._setup_for_step(None, step, reuse=True)
+        assert sim._next_folder_index == 4
+        assert len(calls) == 1
+        # a folder made by something else is still noticed
+        (sim.base_folder / '04-other-sim_fixture').mkdir()
+        # (in case that fell in the same timestamp tick as the last step)
+        os.utime(str(sim.base_folder), ns=(10**9, 10**9))
+        assert sim._next_folder_index == 5
+        assert len(calls) == 2
+
     def test_compile_tpr(self, sim_with_dir):
         sim, path = sim_with_dir
         step = 'minimize'
@@ -135,8 +314,11 @@ class TestSimulation(object):
         assert mdout.exists()
         d_tpr = sim.tprs[step]
         assert tpr.samefile(d_tpr)
-        assert isinstance(sim.outputs['compile_{}_out'.format(step)], str)
-        assert isinstance(sim.outputs['compile_{}_err'.format(step)], str)
+        for key in ('compile_{}_out', 'compile_{}_err'):
+            log_path = sim.outputs[key.format(step)]
+            assert isinstance(log_path, pathlib.Path)
+            assert log_path.is_file()
+            assert log_path.parent.samefile(min_path)
 
     @pytest.fixture
     def sim_with_tpr(self, sim_with_dir):
@@ -160,8 +342,8 @@ class TestSimulation(object):
         assert gro.samefile(sim.last_geometry)
         assert gro.samefile(sim.geometries[step])
         assert isinstance(sim.deffnms[step], pathlib.Path)
-        assert isinstance(sim.outputs['run_{}_out'.format(step)], str)
-        assert isinstance(sim.outputs['run_{}_err'.format(step)], str)
+        for key in ('run_{}_out', 'run_{}_err'):
+            assert sim.outputs[key.format(step)].is_file()
 
     @pytest.mark.parametrize('step', list(mdps.keys()))
     def test_step_methods(self, sim, step):
@@ -173,3 +355,64 @@ class TestSimulation(object):
         d_step_dir = sim.directories[step]
         assert isinstance(d_step_dir, pathlib.Path)
         assert step_dir.samefile(d_step_dir)
+
+
+def test_simple_simulation_mol_inputs(molecule, path_test_data):
+    from paratemp.sim_setup import SimpleSimulation
+    mol, tmp_path = molecule
+    with cd(tmp_path):
+        ssim = SimpleSimulation(
+            'mix', mol_inputs=[mol, dict(geometry=path_test_data / 'water.mol2',
+                                         name='water2')])
+    assert [m.name for m in ssim.molecules] == [mol.name, 'water2']
+    assert ssim.n_molecules == 2
+    assert ssim.directories['molecule_water2'] == tmp_path / 'water2'
+
+
+def test_simple_simulation_insert_dielectric(molecule, tmp_path):
+    from paratemp.sim_setup import SimpleSimulation
+    mol, mol_path = molecule
+    with cd(mol_path):
+        ssim = SimpleSimulation('mdps', mol_inputs=[mol],
+                                solvent_dielectric=2.5)
+    ssim.directories['simulation_base'] = tmp_path / 'base'
+    ssim.directories['simulation_base'].mkdir()
+    source = tmp_path / 'step.mdp'
+    source.write_text('epsilon-r = {dielectric}\n')
+    out = ssim._insert_dielectric(dict(step=str(source)))
+    assert pathlib.Path(out['step']).read_text() == 'epsilon-r = 2.5\n'
+    # later edits to the source mdp are picked up
+    source.write_text('epsilon-r = {dielectric}\nnsteps = 10\n')
+    out = ssim._insert_dielectric(dict(step=str(source)))
+    assert (pathlib.Path(out['step']).read_text() ==
+            'epsilon-r = 2.5\nnsteps = 10\n')
+
+
+def test_simple_simulation_mdp_templates_cached(molecule, tmp_path,
+                                                monkeypatch):
+    from paratemp.sim_setup import SimpleSimulation
+    mol, mol_path = molecule
+    with cd(mol_path):
+        ssim = SimpleSimulation('mdps', mol_inputs=[mol])
+    ssim.directories['simulation_base'] = tmp_path / 'base'
+    ssim.directories['simulation_base'].mkdir()
+    source = tmp_path / 'step.mdp'
+    source.write_text('epsilon-r = {dielectric}\n')
+    os.utime(str(source), ns=(0, 0))  # settled, so it can be cached
+    ssim._insert_dielectric(dict(step=str(source)))
+    out = ssim.directories['simulation_base'] / 'step.mdp'
+
+    def fail(*args, **kwargs):
+        raise AssertionError('mdp file read again')
+    with monkeypatch.context() as m:
+        m.setattr(pathlib.Path, 'read_text', fail)
+        mtime = out.stat().st_mtime_ns
+        ssim._insert_dielectric(dict(step=str(source)))  # nothing to do
+        assert out.stat().st_mtime_ns == mtime
+        ssim._dielectric = 2.5
+        ssim._insert_dielectric(dict(step=str(source)))
+    assert out.read_text() == 'epsilon-r = 2.5\n'
+    source.write_text('epsilon-r = {dielectric}\nnsteps = 10\n')
+    os.utime(str(source), ns=(10**9, 10**9))
+    ssim._insert_dielectric(dict(step=str(source)))
+    assert out.read_text() == 'epsilon-r = 2.5\nnsteps = 10\n'
@@ -51,7 +51,9 @@ def test_find_nearest_idx(ref_temps):
 def test_running_mean():
     from paratemp.tools import running_mean
     tl = [0, 2, 4]
-    assert (running_mean(tl) == [1, 3]).all()
+    assert np.array_equal(running_mean(tl), np.array([1., 3.]))
+    x = np.arange(10, dtype=np.float64)
+    assert np.allclose(running_mean(x, 3), np.arange(1, 9))
     with pytest.raises(ValueError):
         running_mean((), 2)
 
@@ -61,3 +63,13 @@ def test_all_elements_same():
     assert aes([0, 0, 0, 0, 0, 0])
     assert not aes([0, 0.2])
     assert not aes(['a', 'b'])
+
+
+def test_stable_stat(tmp_path):
+    import os
+    from paratemp.tools import _stable_stat
+    f = tmp_path / 'a.txt'
+    f.write_text('a')
+    assert _stable_stat(str(f)) is None  # just modified
+    os.utime(str(f), ns=(0, 0))
+    assert _stable_stat(str(f)).st_mtime_ns == 0